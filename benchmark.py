@@ -0,0 +1,282 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import datetime
+import platform
+import random
+import tempfile
+import subprocess
+import tracemalloc
+
+import foreign_orders
+import legacy_normalize
+import logic
+import order_ids
+import standin
+
+
+"""
+Benchmark of the pick list stages on synthetic orders (see standin.synthetic_orders).
+
+	python benchmark.py 									200, 2k, 20k, and 200k orders; writes benchmark_results.json
+	python benchmark.py --sizes 200 2000 --repeat 5
+	python benchmark.py --output new.json --compare old.json 	compare with results of another commit
+	python benchmark.py --normalizer 							check the normalization rules against the old chain
+
+Each size is timed per stage (parse, clean, render; best of --repeat runs), then run once more under tracemalloc for
+each stage's peak memory. Parsing writes its log, order ID, and foreign order files to a temporary directory.
+
+The normalizer check runs logic.normalize_sku and the frozen old if/elif chain (legacy_normalize) on every synthetic SKU
+layout plus random SKUs of every brand, reports any SKU they normalize differently, and times both; it exits with 1 if
+any SKU differs. Run it after every rule change.
+"""
+
+SIZES = [200, 2000, 20000, 200000]
+STAGES = ['parse', 'clean', 'render']
+RESULTS_FILE = 'benchmark_results.json'
+
+# synthetic orders come from one store ID
+STORE_ID = '4'
+
+# middle segments and sizes of the normalizer check's random SKUs: every literal the rules test for, plus filler
+NORMALIZER_SEGMENTS = [
+	'631NEW', 'NEW', 'XNEW', 'TS201', 'LS', 'SS', 'WHT', 'BRIT', 'GRN', 'CHAR', 'BLK', 'GREY', 'RED', 'NAVY', 'KAK', 'PURP',
+	'3065', '45', 'PS400461N', '438BT', 'BT', 'ES5110', 'SS2115', 'HFK700', 'HFK200', 'WOM', '10', 'B339', 'WHT/BLK',
+	'DENIM', 'X', 'TSX', '1BT', 'ES',
+]
+NORMALIZER_SIZES = ['SML', 'MED', 'LRG', 'XL', 'XXL', '2XL', '38X32', '5XL']
+# random SKUs per brand and number of segments
+NORMALIZER_SKUS_PER_LAYOUT = 400
+
+
+# helper: current commit, so results of different commits can be told apart
+def _commit():
+	try:
+		return subprocess.run(
+			['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+			capture_output=True, text=True, check=True
+		).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+
+def run_stages(orders, directory, trace=False):
+	"""
+	Runs the parse, clean, and render stages on orders; returns {stage: {"seconds": float, "peak_bytes": int or None}}
+
+		orders: 	list of JSON order dictionaries
+		directory: 	string of the name of an empty directory for the log, order ID, foreign order, and pick list files
+		trace: 		boolean to measure each stage's peak memory with tracemalloc (slows every stage down)
+	"""
+	new_orders_dict = {}
+	item_quantity_more_than_one_dict = {}
+	customer_name_more_than_one_dict = {}
+	cleaned_orders_dict = {}
+	# sort keys are memoized; every run starts cold
+	logic.size_sort_key.cache_clear()
+
+	stages = {}
+
+	def timed(stage, func):
+		if trace:
+			tracemalloc.start()
+		start = time.perf_counter()
+		func()
+		seconds = time.perf_counter() - start
+		peak_bytes = None
+		if trace:
+			peak_bytes = tracemalloc.get_traced_memory()[1]
+			tracemalloc.stop()
+		stages[stage] = {'seconds': seconds, 'peak_bytes': peak_bytes}
+
+	def parse():
+		order_id_store = order_ids.OrderIdStore(os.path.join(directory, 'ids.txt'))
+		log_file = os.path.join(directory, 'log.txt')
+		foreign = foreign_orders.ForeignOrders()
+		with logic.LogWriter(log_file, order_id_store, foreign) as log_writer:
+			logic.parse_awaiting_shipment_order_data(
+				orders,
+				customer_name_more_than_one_dict,
+				order_id_store,
+				log_writer,
+				item_quantity_more_than_one_dict,
+				new_orders_dict,
+				is_ebay=False
+				)
+		order_id_store.close()
+		foreign.write(os.path.join(directory, 'world_map.html'))
+
+	timed('parse', parse)
+	timed('clean', lambda: logic.clean_and_normalize_order_data(new_orders_dict, cleaned_orders_dict))
+	timed('render', lambda: logic.create_pick_list(cleaned_orders_dict, os.path.join(directory, 'orders.txt')))
+	return stages
+
+
+def benchmark(size, repeat=3, seed=0):
+	"""
+	Returns the result dictionary of one size: "orders", "items", and per stage the best "seconds" and "peak_bytes"
+	"""
+	orders = standin.synthetic_orders(STORE_ID, size, seed=seed)
+	result = {'orders': size, 'items': sum(len(order['items']) for order in orders), 'stages': {}}
+
+	runs = []
+	for _run in range(repeat):
+		directory = tempfile.mkdtemp(prefix='picklist-bench-')
+		try:
+			runs.append(run_stages(orders, directory))
+		finally:
+			shutil.rmtree(directory)
+
+	directory = tempfile.mkdtemp(prefix='picklist-bench-')
+	try:
+		traced = run_stages(orders, directory, trace=True)
+	finally:
+		shutil.rmtree(directory)
+
+	for stage in STAGES:
+		result['stages'][stage] = {
+			'seconds': min(run[stage]['seconds'] for run in runs),
+			'peak_bytes': traced[stage]['peak_bytes'],
+		}
+	result['total_seconds'] = sum(stage['seconds'] for stage in result['stages'].values())
+	return result
+
+
+def normalizer_skus(seed=0, per_layout=NORMALIZER_SKUS_PER_LAYOUT):
+	"""
+	Returns the sorted list of SKUs the normalizer check runs on: every synthetic SKU (see standin.SYNTHETIC_SKUS) and
+	random SKUs of 2 to 7 segments for every brand of the normalization rules and one unknown brand
+	"""
+	rng = random.Random(seed)
+	brands = sorted({brand for rule in logic.NORMALIZATION_RULES for brand in rule['brands']}) + ['FOO']
+
+	skus = {template.format(size) for template, sizes in standin.SYNTHETIC_SKUS for size in sizes}
+	for brand in brands:
+		for segments in range(2, 8):
+			for _sku in range(per_layout):
+				skus.add('-'.join([brand] + rng.choices(NORMALIZER_SEGMENTS, k=segments - 2) + [rng.choice(NORMALIZER_SIZES)]))
+	return sorted(skus)
+
+
+# helper: the old chain's result of a SKU, or LegacyLayoutError if the old chain failed on it
+def _legacy_normalized(SKU):
+	try:
+		return legacy_normalize.normalize_sku(SKU)
+	except legacy_normalize.LegacyLayoutError:
+		return legacy_normalize.LegacyLayoutError
+
+
+def check_normalizer(seed=0, repeat=3):
+	"""
+	Normalizes every SKU of normalizer_skus with the rule table and the old chain; returns a dictionary of "skus",
+	"legacy_failures" (SKUs the old chain failed on, left out of the comparison and timing), "differences" (list of
+	(SKU, old result, new result)), and the best of repeat "legacy_seconds" and "table_seconds" over the compared SKUs
+	(the two are timed in alternating runs, so a slower stretch of the machine does not land on one of them only)
+	"""
+	skus = normalizer_skus(seed)
+	compared = []
+	differences = []
+	for SKU in skus:
+		legacy = _legacy_normalized(SKU)
+		if legacy is legacy_normalize.LegacyLayoutError:
+			continue
+		compared.append(SKU)
+		normalized = logic.normalize_sku(SKU)
+		if normalized != legacy:
+			differences.append((SKU, legacy, normalized))
+
+	def timed(normalize):
+		start = time.perf_counter()
+		for SKU in compared:
+			normalize(SKU)
+		return time.perf_counter() - start
+
+	legacy_times = []
+	table_times = []
+	for _run in range(repeat):
+		legacy_times.append(timed(legacy_normalize.normalize_sku))
+		table_times.append(timed(logic.normalize_sku))
+
+	return {
+		'skus': len(skus),
+		'legacy_failures': len(skus) - len(compared),
+		'differences': differences,
+		'legacy_seconds': min(legacy_times),
+		'table_seconds': min(table_times),
+	}
+
+
+def compare(results, baseline):
+	"""
+	Returns printable lines of each stage's time relative to a baseline results dictionary (e.g. 1.25x is 25% slower)
+	"""
+	baseline_by_size = {result['orders']: result for result in baseline['results']}
+	lines = [f"compared with {baseline.get('commit') or 'baseline'}:"]
+	for result in results['results']:
+		old = baseline_by_size.get(result['orders'])
+		if old is None:
+			continue
+		ratios = []
+		for stage in STAGES:
+			old_seconds = old['stages'][stage]['seconds']
+			ratio = result['stages'][stage]['seconds'] / old_seconds if old_seconds else float('nan')
+			ratios.append(f'{stage} {ratio:5.2f}x')
+		lines.append(f"{result['orders']:>8} orders  " + '  '.join(ratios))
+	return lines
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='Benchmark the pick list stages on synthetic orders.')
+	parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='numbers of orders')
+	parser.add_argument('--repeat', type=int, default=3, help='timed runs per size (the best is kept)')
+	parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic orders')
+	parser.add_argument('--output', default=RESULTS_FILE, help='JSON results file')
+	parser.add_argument('--compare', help='JSON results file of an earlier run to compare with')
+	parser.add_argument('--normalizer', action='store_true', help='check the normalization rules against the old chain instead')
+	args = parser.parse_args(argv)
+
+	if args.normalizer:
+		check = check_normalizer(args.seed, args.repeat)
+		for SKU, legacy, normalized in check['differences']:
+			print(f'{SKU}: old {legacy}, rules {normalized}')
+		compared = check['skus'] - check['legacy_failures']
+		print(f"{check['skus']} SKUs, {check['legacy_failures']} the old chain fails on, {compared} compared: "
+			f"{len(check['differences'])} normalized differently")
+		print(f"old chain {check['legacy_seconds'] / compared * 1e6:.2f} us per SKU, "
+			f"rules {check['table_seconds'] / compared * 1e6:.2f} us per SKU "
+			f"({check['table_seconds'] / check['legacy_seconds']:.2f}x)")
+		return 1 if check['differences'] else 0
+
+	results = {
+		'commit': _commit(),
+		'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+		'python': platform.python_version(),
+		'platform': platform.platform(),
+		'repeat': args.repeat,
+		'seed': args.seed,
+		'results': [],
+	}
+
+	print(f"{'orders':>8} {'items':>8}  " + '  '.join(f'{stage:>16}' for stage in STAGES) + f"  {'total':>8}")
+	for size in args.sizes:
+		result = benchmark(size, args.repeat, args.seed)
+		results['results'].append(result)
+		stages = '  '.join(
+			f"{s['seconds']:7.3f}s {s['peak_bytes'] / 2**20:5.1f}MB" for s in (result['stages'][stage] for stage in STAGES)
+		)
+		print(f"{size:>8} {result['items']:>8}  {stages}  {result['total_seconds']:7.3f}s")
+
+	with open(args.output, 'w', encoding='utf-8') as f:
+		json.dump(results, f, indent=2)
+	print('\nresults written to ' + args.output)
+
+	if args.compare:
+		with open(args.compare, 'r', encoding='utf-8') as f:
+			print('\n' + '\n'.join(compare(results, json.load(f))))
+
+
+if __name__ == '__main__':
+	sys.exit(main())
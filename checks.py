@@ -0,0 +1,192 @@
+import sys
+import json
+import random
+import argparse
+import itertools
+
+import json_stream
+import logic
+import standin
+
+
+"""
+Randomized checks of code that is easy to get subtly wrong and that the pick list output alone would not catch.
+
+	python checks.py 							every check
+	python checks.py decoder --runs 5000 		one check with more runs
+	python checks.py --seed 7 					other random cases
+
+	decoder: 	json_stream.ArrayParser fed random documents split at random chunk boundaries returns the same elements and
+				fields as json.loads, and raises ValueError for every truncated document
+	partition: 	logic.partition_balanced splits random weights into contiguous, non-empty ranges in order, one per part (or
+				per weight if fewer), whose largest total is the smallest of every possible split (found by brute force)
+
+Each check prints its number of runs and any failing case; the script exits with 1 if a check failed. Run them after
+changing the code they cover.
+"""
+
+RUNS = 1000
+
+# at most this many failing cases are printed per check
+MAX_FAILURES_SHOWN = 5
+
+
+# helper: random string with characters that must be escaped or that delimit JSON outside a string
+def _random_string(rng):
+	return ''.join(rng.choice('ab ,:[]{}"\\/\n\té中\U0001f4a9') for _char in range(rng.randrange(12)))
+
+
+# helper: random JSON value for the decoder check: escapes, unicode, and brackets in strings, numbers of every form, nesting
+def _random_value(rng, depth=0):
+	kind = rng.randrange(8 if depth < 3 else 5)
+	if kind == 0:
+		return rng.choice([None, True, False])
+	if kind == 1:
+		return rng.randint(-10 ** 12, 10 ** 12)
+	if kind == 2:
+		return rng.choice([0.5, -1.25e-7, 3.0e21, 1e300, rng.uniform(-1e6, 1e6)])
+	if kind in (3, 4):
+		return _random_string(rng)
+	if kind in (5, 6):
+		return {_random_string(rng): _random_value(rng, depth + 1) for _member in range(rng.randrange(4))}
+	return [_random_value(rng, depth + 1) for _element in range(rng.randrange(4))]
+
+
+# helper: random ShipStation-like page: the "orders" array among other members in random order
+def _random_page(rng):
+	orders = standin.synthetic_orders(str(rng.randrange(1, 7)), rng.randrange(4), seed=rng.randrange(1000))
+	orders += [_random_value(rng) for _element in range(rng.randrange(3))]
+	members = [('orders', orders), ('total', len(orders)), ('page', 1), ('pages', rng.randrange(1, 5))]
+	members += [(f'extra{i}', _random_value(rng)) for i in range(rng.randrange(3))]
+	rng.shuffle(members)
+	return dict(members)
+
+
+# helper: text of a document with random spacing and escaping
+def _random_text(rng, document):
+	indent = rng.choice([None, None, 0, 2])
+	separators = rng.choice([(',', ':'), (', ', ': '), (' ,\n', ' :\t')])
+	text = json.dumps(document, indent=indent, separators=separators, ensure_ascii=rng.random() < 0.5)
+	return rng.choice(['', ' ', '\n']) + text + rng.choice(['', '\n', ' \r\n'])
+
+
+# helper: text split into chunks at random boundaries, sometimes one character at a time
+def _random_chunks(rng, text):
+	if rng.random() < 0.1:
+		return list(text)
+	chunks = []
+	pos = 0
+	while pos < len(text):
+		end = pos + rng.randrange(1, rng.choice([4, 64, 4096]))
+		chunks.append(text[pos:end])
+		pos = end
+	return chunks
+
+
+# helper: elements and fields the parser returns for chunks, the last chunk fed with final=True
+def _parse_chunks(chunks, key):
+	parser = json_stream.ArrayParser(key)
+	elements = []
+	for chunk in chunks:
+		elements.extend(parser.feed(chunk))
+	elements.extend(parser.feed('', final=True))
+	return elements, parser.fields
+
+
+def check_decoder(rng, runs):
+	"""
+	Returns the list of failing cases of json_stream.ArrayParser over runs random documents
+	"""
+	failures = []
+	for _run in range(runs):
+		document = _random_page(rng)
+		text = _random_text(rng, document)
+		expected_fields = {key: value for key, value in document.items() if key != 'orders'}
+
+		chunks = _random_chunks(rng, text)
+		try:
+			elements, fields = _parse_chunks(chunks, 'orders')
+		except ValueError as e:
+			failures.append(f'{e!r} for chunks {chunks!r}')
+			continue
+		if elements != document['orders'] or fields != expected_fields:
+			failures.append(f'wrong result for chunks {chunks!r}')
+
+		# a document cut before its closing brace is never complete
+		truncated = text[:rng.randrange(len(text.rstrip()))]
+		try:
+			_parse_chunks(_random_chunks(rng, truncated), 'orders')
+		except ValueError:
+			continue
+		failures.append(f'no error for truncated text {truncated!r}')
+	return failures
+
+
+# longest weight list of the partition check (brute force tries every split, so it grows as 2 ** length)
+PARTITION_MAX_WEIGHTS = 10
+
+
+# helper: smallest largest range total of any split of weights into at most parts contiguous ranges
+def _best_largest_total(weights, parts):
+	best = sum(weights)
+	for cuts in range(1, min(parts, len(weights))):
+		for bounds in itertools.combinations(range(1, len(weights)), cuts):
+			edges = (0,) + bounds + (len(weights),)
+			best = min(best, max(sum(weights[start:end]) for start, end in zip(edges, edges[1:])))
+	return best
+
+
+def check_partition(rng, runs):
+	"""
+	Returns the list of failing cases of logic.partition_balanced over runs random weight lists
+	"""
+	failures = []
+	for _run in range(runs):
+		weights = [rng.randint(1, rng.choice([3, 20])) for _weight in range(rng.randint(1, PARTITION_MAX_WEIGHTS))]
+		parts = rng.randint(1, len(weights) + 2)
+		ranges = logic.partition_balanced(weights, parts)
+
+		starts = [start for start, _end in ranges]
+		ends = [end for _start, end in ranges]
+		if starts != [0] + ends[:-1] or ends[-1:] != [len(weights)] or any(start >= end for start, end in ranges):
+			failures.append(f'ranges {ranges} do not cover {weights} in order')
+		elif len(ranges) != min(parts, len(weights)):
+			failures.append(f'{len(ranges)} ranges of {weights} for {parts} parts')
+		else:
+			largest = max(sum(weights[start:end]) for start, end in ranges)
+			best = _best_largest_total(weights, parts)
+			if largest != best:
+				failures.append(f'largest total {largest} instead of {best}: ranges {ranges} of {weights} for {parts} parts')
+	return failures
+
+
+# key : str (check name)
+# val : function(random.Random, int runs) returning the list of failing cases
+CHECKS = {
+	'decoder': check_decoder,
+	'partition': check_partition,
+}
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='Randomized checks of the decoder, wave partitioning, and other code without tests.')
+	parser.add_argument('checks', nargs='*', help=f'checks to run: {", ".join(CHECKS)} (default: every check)')
+	parser.add_argument('--runs', type=int, default=RUNS, help='random cases per check')
+	parser.add_argument('--seed', type=int, default=0, help='seed of the random cases')
+	args = parser.parse_args(argv)
+	unknown = [name for name in args.checks if name not in CHECKS]
+	if unknown:
+		parser.error(f'unknown check {", ".join(unknown)} (choose from {", ".join(CHECKS)})')
+
+	failed = False
+	for name in args.checks or list(CHECKS):
+		failures = CHECKS[name](random.Random(args.seed), args.runs)
+		print(f'{name}: {args.runs} runs, {len(failures)} failed')
+		for failure in failures[:MAX_FAILURES_SHOWN]:
+			print('\t' + failure[:500])
+		failed = failed or bool(failures)
+	return 1 if failed else 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,120 @@
+import time
+import sqlite3
+import datetime
+from collections import namedtuple
+
+
+# a store's orders are dropped from the index when the store has not been run for this many days (they have most likely
+# shipped since)
+STALE_DAYS = 3
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+# one outstanding order in the index
+Entry = namedtuple('Entry', ['store', 'order_num', 'cust_name', 'city', 'country'])
+
+
+class ConsolidationIndex:
+	"""
+	Outstanding orders of every store grouped by customer key (normalized name and ship to address hash, see
+	logic.customer_key), so orders from one customer can ship together even across stores
+
+	Backed by a SQLite file shared by every store run (config.CONSOLIDATION_FILE); each run replaces its own store's
+	orders. The whole index is held in a dictionary of customer key to orders, so a run only reads the file once.
+
+		path: 	string of the name of the index file
+	"""
+
+	def __init__(self, path):
+		self.path = path
+		self._conn = sqlite3.connect(path)
+		self._conn.execute(
+			'CREATE TABLE IF NOT EXISTS orders ('
+			'store TEXT NOT NULL, '
+			'order_num TEXT NOT NULL, '
+			'customer_key TEXT NOT NULL, '
+			'cust_name TEXT, '
+			'city TEXT, '
+			'country TEXT, '
+			'updated INTEGER NOT NULL, '
+			'PRIMARY KEY (store, order_num)'
+			') WITHOUT ROWID'
+		)
+		cutoff = int(time.time()) - STALE_DAYS * SECONDS_PER_DAY
+		with self._conn:
+			self._conn.execute('DELETE FROM orders WHERE updated < ?', (cutoff,))
+
+		# key : str (customer key)
+		# val : list of Entries
+		self._by_customer = {}
+		for key, store, order_num, cust_name, city, country in self._conn.execute(
+			'SELECT customer_key, store, order_num, cust_name, city, country FROM orders ORDER BY store, order_num'
+		):
+			self._by_customer.setdefault(key, []).append(Entry(store, order_num, cust_name, city, country))
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+	def replace_store(self, store, records):
+		"""
+		Replaces a store's orders with its current outstanding orders in a single transaction
+
+			store: 		string of the store label (e.g. "AMZ")
+			records: 	iterable of the store's logic.OrderRecords (records without a customer key are skipped)
+		"""
+		now = int(time.time())
+		rows = [
+			(store, record.order_num, record.customer_key, record.cust_name, record.city, record.country, now)
+			for record in records if record.customer_key
+		]
+		with self._conn:
+			self._conn.execute('DELETE FROM orders WHERE store = ?', (store,))
+			self._conn.executemany('INSERT OR REPLACE INTO orders VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+
+		for key in list(self._by_customer):
+			entries = [entry for entry in self._by_customer[key] if entry.store != store]
+			if entries:
+				self._by_customer[key] = entries
+			else:
+				del self._by_customer[key]
+		for store, order_num, key, cust_name, city, country, _updated in rows:
+			self._by_customer.setdefault(key, []).append(Entry(store, order_num, cust_name, city, country))
+
+	def groups(self):
+		"""
+		Returns every list of Entries (two or more orders) that can ship together, ordered by customer name
+		"""
+		groups = [entries for entries in self._by_customer.values() if len(entries) > 1]
+		groups.sort(key=lambda entries: (entries[0].cust_name or '').casefold())
+		return groups
+
+	def write_report(self, path):
+		"""
+		Writes every group of orders that can ship together; returns (number of groups, number spanning several stores)
+
+		A missing name, city, or country (null in ShipStation) is written as empty.
+		"""
+		groups = self.groups()
+		cross_store = 0
+
+		with open(path, 'w', encoding='utf-8') as f:
+			f.write('ORDERS THAT CAN SHIP TOGETHER - ' + datetime.datetime.now().strftime('%A %b %d %I:%M %p') + '\n')
+			if not groups:
+				f.write('\n\t' + u'\U0001f4a9' + '\n')
+			for entries in groups:
+				stores = {entry.store for entry in entries}
+				if len(stores) > 1:
+					cross_store += 1
+				first = entries[0]
+				f.write('\n' + (first.cust_name or '') + ' - ' + (first.city or '') + ', ' + (first.country or ''))
+				f.write(' (' + ', '.join(sorted(stores)) + ')\n' if len(stores) > 1 else '\n')
+				for entry in entries:
+					f.write('\t' + entry.store + ' ' + entry.order_num + '\n')
+
+		return len(groups), cross_store
+
+	def close(self):
+		self._conn.close()
@@ -0,0 +1,169 @@
+import os
+import html
+import sqlite3
+import datetime
+from urllib.parse import quote_plus
+
+
+"""
+Destinations of foreign (non-US) orders, collected in memory during a run and written once as an HTML map report.
+
+The report covers every run since refresh-all.py reset it (the whole morning): each run adds its destinations to a
+SQLite table of counts kept next to the report and rewrites the report from it in the same write transaction (see
+add_to_report), so store runs that overlap wait for each other and never drop each other's orders.
+"""
+
+# seconds a run waits for another run's report update before giving up
+LOCK_TIMEOUT = 60
+
+
+def _counts_path(path):
+	# world_map.html -> world_map.counts.sqlite3
+	return os.path.splitext(path)[0] + '.counts.sqlite3'
+
+
+# helper: the counts table of the report at path, in autocommit mode so transactions are begun explicitly
+def _connect(path):
+	conn = sqlite3.connect(_counts_path(path), timeout=LOCK_TIMEOUT, isolation_level=None)
+	conn.execute(
+		'CREATE TABLE IF NOT EXISTS destinations ('
+		'country_key TEXT NOT NULL, '
+		'city_key TEXT NOT NULL, '
+		'city TEXT NOT NULL, '
+		'country TEXT NOT NULL, '
+		'orders INTEGER NOT NULL, '
+		'PRIMARY KEY (country_key, city_key)'
+		') WITHOUT ROWID'
+	)
+	return conn
+
+
+# helper: writes text to a temporary file, then renames it, so a reader never sees a partial file
+def _write_atomic(path, text):
+	tmp_path = path + '.tmp'
+	with open(tmp_path, 'w', encoding='utf-8') as f:
+		f.write(text)
+	os.replace(tmp_path, path)
+
+
+class ForeignOrders:
+	"""
+	Foreign order destinations with their number of orders, deduplicated by city and country
+
+	A destination is keyed by its country code and city, ignoring case and surrounding spaces; the report shows the first
+	spelling seen.
+	"""
+
+	def __init__(self):
+		# key : tuple (country, city), both casefolded
+		# val : list [city as first seen, country as first seen, number of orders]
+		self._destinations = {}
+
+	def __len__(self):
+		return len(self._destinations)
+
+	def add(self, city, country, number_of_orders=1):
+		"""
+		Counts orders (one by default) shipping to a city of a country
+		"""
+		city = (city or '').strip()
+		country = (country or '').strip()
+		key = (country.casefold(), city.casefold())
+		destination = self._destinations.get(key)
+		if destination is None:
+			self._destinations[key] = [city, country, number_of_orders]
+		else:
+			destination[2] += number_of_orders
+
+	def orders(self):
+		"""
+		Returns the total number of foreign orders
+		"""
+		return sum(destination[2] for destination in self._destinations.values())
+
+	def by_country(self):
+		"""
+		Returns a list of (country, number of orders, list of (city, number of orders)), countries and cities with the
+		most orders first
+		"""
+		countries = {}
+		for city, country, number_of_orders in self._destinations.values():
+			countries.setdefault(country.upper(), []).append((city, number_of_orders))
+
+		grouped = []
+		for country, cities in countries.items():
+			cities.sort(key=lambda city: (-city[1], city[0].casefold()))
+			grouped.append((country, sum(number_of_orders for _city, number_of_orders in cities), cities))
+		grouped.sort(key=lambda country: (-country[1], country[0]))
+		return grouped
+
+	def write(self, path):
+		"""
+		Writes the HTML report of every destination grouped by country, each city linked to Google Maps
+
+		The report is written to a temporary file, then renamed, so a reader never sees a partial report.
+		"""
+		escape = html.escape
+		parts = [
+			'<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n<title>Foreign Orders</title>\n</head>\n<body>\n',
+			'<h1>Foreign Orders</h1>\n',
+			'<p>' + datetime.datetime.now().strftime('%A %b %d %I:%M %p') + ' - ' + str(self.orders()) + ' orders, '
+			+ str(len(self)) + ' destinations</p>\n',
+		]
+		for country, number_of_orders, cities in self.by_country():
+			parts.append('<h2>' + escape(country) + ' (' + str(number_of_orders) + ')</h2>\n<ul>\n')
+			for city, city_orders in cities:
+				g_maps = 'https://www.google.com/maps/place/' + quote_plus(city + ', ' + country) + '/'
+				label = escape(city) + ', ' + escape(country)
+				if city_orders > 1:
+					label += ' (' + str(city_orders) + ')'
+				parts.append('<li><a href="' + escape(g_maps) + '">' + label + '</a></li>\n')
+			parts.append('</ul>\n')
+		parts.append('</body>\n</html>\n')
+
+		_write_atomic(path, ''.join(parts))
+
+
+def add_to_report(path, foreign):
+	"""
+	Adds a run's destinations to the counts of every run since the last reset and rewrites the report at path from them;
+	returns the ForeignOrders of the whole report
+
+	The counts are updated and the report is written while holding the counts table's write lock, so a run that
+	overlaps waits (up to LOCK_TIMEOUT seconds) and then adds to this run's counts rather than replacing them.
+	"""
+	conn = _connect(path)
+	try:
+		conn.execute('BEGIN IMMEDIATE')
+		try:
+			conn.executemany(
+				'INSERT INTO destinations VALUES (?, ?, ?, ?, ?) '
+				'ON CONFLICT (country_key, city_key) DO UPDATE SET orders = orders + excluded.orders',
+				((country_key, city_key, city, country, number_of_orders)
+				 for (country_key, city_key), (city, country, number_of_orders) in foreign._destinations.items())
+			)
+			report = ForeignOrders()
+			for city, country, number_of_orders in conn.execute('SELECT city, country, orders FROM destinations'):
+				report.add(city, country, number_of_orders)
+			report.write(path)
+		except:
+			conn.execute('ROLLBACK')
+			raise
+		conn.execute('COMMIT')
+	finally:
+		conn.close()
+	return report
+
+
+def reset(path):
+	"""
+	Starts a new report at path: drops the destinations counted by earlier runs and writes an empty report
+	"""
+	conn = _connect(path)
+	try:
+		conn.execute('BEGIN IMMEDIATE')
+		conn.execute('DELETE FROM destinations')
+		ForeignOrders().write(path)
+		conn.execute('COMMIT')
+	finally:
+		conn.close()
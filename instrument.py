@@ -0,0 +1,126 @@
+import os
+import json
+import time
+import cProfile
+import datetime
+import threading
+from contextlib import contextmanager
+
+
+"""
+Per-run stage timers and counters, written as a JSON run report next to the pick list.
+
+	with instrument.timer('render'): ... 	adds the block's seconds to the "render" stage
+	instrument.count('orders', 3) 			adds 3 to the "orders" counter
+
+PICKLIST_PROFILE=1 also profiles the run with cProfile and writes the stats next to the pick list (see profiled).
+"""
+
+PROFILE = os.environ.get('PICKLIST_PROFILE', '') not in ('', '0')
+
+_lock = threading.Lock()
+_started = time.perf_counter()
+_started_at = datetime.datetime.now()
+
+# key : str (stage name)
+# val : list [float (seconds), int (calls)]
+_timings = {}
+
+# key : str (counter name)
+# val : int
+_counters = {}
+
+
+def reset():
+	"""
+	Clears every timer and counter and restarts the run clock
+	"""
+	global _started, _started_at
+	with _lock:
+		_timings.clear()
+		_counters.clear()
+		_started = time.perf_counter()
+		_started_at = datetime.datetime.now()
+
+
+@contextmanager
+def timer(stage):
+	"""
+	Adds the seconds spent in the with block to a stage; blocks on several threads add up
+	"""
+	start = time.perf_counter()
+	try:
+		yield
+	finally:
+		seconds = time.perf_counter() - start
+		with _lock:
+			timing = _timings.setdefault(stage, [0.0, 0])
+			timing[0] += seconds
+			timing[1] += 1
+
+
+def add_time(stage, seconds):
+	"""
+	Adds seconds measured elsewhere (e.g. before this module was imported) to a stage
+	"""
+	with _lock:
+		timing = _timings.setdefault(stage, [0.0, 0])
+		timing[0] += seconds
+		timing[1] += 1
+
+
+def count(name, n=1):
+	"""
+	Adds n to a counter; call once per batch rather than per item in hot loops
+	"""
+	with _lock:
+		_counters[name] = _counters.get(name, 0) + n
+
+
+def report(**extra):
+	"""
+	Returns the run report dictionary: "started", "seconds", "stages" ({stage: {"seconds", "calls"}}), "counters",
+	and every extra keyword argument
+	"""
+	with _lock:
+		data = {
+			'started': _started_at.isoformat(timespec='seconds'),
+			'seconds': round(time.perf_counter() - _started, 4),
+			'stages': {stage: {'seconds': round(seconds, 4), 'calls': calls} for stage, (seconds, calls) in _timings.items()},
+			'counters': dict(_counters),
+		}
+	data.update(extra)
+	return data
+
+
+def report_path(ORDERS_FILE, extension='.report.json'):
+	# amazon_orders.txt -> amazon_orders.report.json
+	return os.path.splitext(ORDERS_FILE)[0] + extension
+
+
+def write_report(ORDERS_FILE, **extra):
+	"""
+	Writes the run report (see report) next to the pick list file; returns the report's file name
+	"""
+	path = report_path(ORDERS_FILE)
+	with open(path, 'w', encoding='utf-8') as f:
+		json.dump(report(**extra), f, indent=2)
+	return path
+
+
+@contextmanager
+def profiled(ORDERS_FILE, enabled=None):
+	"""
+	Profiles the with block with cProfile when enabled (default: PICKLIST_PROFILE is set) and writes the stats next to
+	the pick list file (e.g. amazon_orders.prof, readable with python -m pstats)
+	"""
+	if not (PROFILE if enabled is None else enabled):
+		yield
+		return
+	profiler = cProfile.Profile()
+	profiler.enable()
+	try:
+		yield
+	finally:
+		profiler.disable()
+		profiler.dump_stats(report_path(ORDERS_FILE, '.prof'))
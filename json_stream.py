@@ -0,0 +1,145 @@
+import re
+import json
+
+
+"""
+Incremental decoding of a JSON object holding one large array, e.g. a ShipStation page {"orders": [...], "total": ...}.
+
+Text is fed in chunks as it arrives; each complete array element is returned as soon as its closing bracket is read,
+so only the unparsed tail of the text and the current element are held in memory.
+"""
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# characters after the digits decoded so far that mean a number goes on
+_NUMBER_CONTINUES = frozenset('.eE+-')
+
+
+class ArrayParser:
+	"""
+	Push parser for a top-level JSON object whose key array is streamed element by element
+
+		key: 	string of the name of the array to stream (e.g. "orders")
+
+	Every other top-level member (e.g. "total", "page", "pages") is decoded whole and kept in fields.
+	Raises ValueError (json.JSONDecodeError for a malformed value) if the text is not such an object.
+	"""
+
+	def __init__(self, key):
+		self.key = key
+		# key : str (top-level member name)
+		# val : decoded value of every member other than the streamed array
+		self.fields = {}
+		self._decode = json.JSONDecoder().raw_decode
+		self._buf = ''
+		self._pos = 0
+		self._state = 'start'
+		self._member = None
+
+	# helper: decoded value at pos and where it ends, or None if the value may not be complete yet
+	def _value(self, pos, final):
+		try:
+			value, end = self._decode(self._buf, pos)
+		except json.JSONDecodeError:
+			if final:
+				raise
+			return None
+		if not final and type(value) in (int, float):
+			# a number at the very end of the text may continue in the next chunk, and one followed by the start of a
+			# fraction or exponent ("3" of "3e+21" read as far as "3e") is not complete yet either
+			if end == len(self._buf) or self._buf[end] in _NUMBER_CONTINUES:
+				return None
+		return value, end
+
+	def feed(self, text, final=False):
+		"""
+		Parses the next chunk of text; returns the list of array elements completed by it
+
+			text: 	string of the next chunk
+			final: 	boolean, True for the last chunk (raises ValueError if the object is still incomplete)
+		"""
+		self._buf = self._buf[self._pos:] + text
+		self._pos = 0
+		elements = []
+
+		while True:
+			pos = _WHITESPACE.match(self._buf, self._pos).end()
+			if pos == len(self._buf):
+				break
+			char = self._buf[pos]
+			state = self._state
+
+			if state == 'start':
+				if char != '{':
+					raise ValueError(f'expected a JSON object, found {char!r}')
+				self._state = 'member'
+				pos += 1
+
+			elif state == 'member':
+				if char == '}':
+					self._state = 'done'
+					pos += 1
+				else:
+					decoded = self._value(pos, final) if char == '"' else None
+					if decoded is None:
+						if char != '"':
+							raise ValueError(f'expected a member name, found {char!r}')
+						break
+					self._member, pos = decoded
+					self._state = 'colon'
+
+			elif state == 'colon':
+				if char != ':':
+					raise ValueError(f'expected ":", found {char!r}')
+				self._state = 'value'
+				pos += 1
+
+			elif state == 'value':
+				if self._member == self.key and char == '[':
+					self._state = 'element'
+					pos += 1
+				else:
+					decoded = self._value(pos, final)
+					if decoded is None:
+						break
+					self.fields[self._member], pos = decoded
+					self._state = 'member_end'
+
+			elif state == 'element':
+				if char == ']':
+					self._state = 'member_end'
+					pos += 1
+				else:
+					decoded = self._value(pos, final)
+					if decoded is None:
+						break
+					element, pos = decoded
+					elements.append(element)
+					self._state = 'element_end'
+
+			elif state == 'element_end':
+				if char == ',':
+					self._state = 'element'
+				elif char == ']':
+					self._state = 'member_end'
+				else:
+					raise ValueError(f'expected "," or "]", found {char!r}')
+				pos += 1
+
+			elif state == 'member_end':
+				if char == ',':
+					self._state = 'member'
+				elif char == '}':
+					self._state = 'done'
+				else:
+					raise ValueError(f'expected "," or "}}", found {char!r}')
+				pos += 1
+
+			else:
+				raise ValueError(f'unexpected {char!r} after the end of the JSON object')
+
+			self._pos = pos
+
+		if final and self._state != 'done':
+			raise ValueError('incomplete JSON object')
+		return elements
@@ -0,0 +1,206 @@
+"""
+Frozen copy of the SKU normalization chain that logic.NORMALIZATION_RULES replaced, kept only as the reference the rule
+table is checked against (python benchmark.py --normalizer). Nothing in the pick list uses it; do not update it when a
+rule changes, the check is there to show what the change does.
+"""
+
+
+class LegacyLayoutError(ValueError):
+	"""
+	The old chain could not normalize a SKU of a known brand with an unexpected layout (it failed the whole run)
+	"""
+
+
+def normalize_sku(SKU):
+	"""
+	Returns the (brand_and_style, size) of a SKU as the old if/elif chain did, or None if the SKU cannot be normalized
+
+	Raises LegacyLayoutError where the old chain raised (a known brand with an unexpected number of segments).
+	"""
+	try:
+		return _normalize_sku(SKU)
+	except (ValueError, TypeError) as e:
+		raise LegacyLayoutError(SKU) from e
+
+
+# helper: the old chain, unchanged apart from returning instead of adding to cleaned_orders_dict
+def _normalize_sku(SKU):
+	sku_array = SKU.split('-')
+	brand = sku_array[0]
+
+	brand_and_style = None
+	size = None
+
+	#--- PREMIER
+	if brand == 'PREM':
+		# PREM-646-MED, PREM-631NEW-LRG, PREM-210P-5XL
+		if len(sku_array) == 3:
+			premier, style, _size = sku_array
+			# PREM-631NEW-XL
+			if style[-3:] == 'NEW':
+				style = style[:3]
+			brand_and_style = premier + '-' + style
+			size = _size
+		# PREM-618-RED-MED, PREM-SS-101-LRG, PREM-TS201-LS-SML, PREM-TS201-SS-SML
+		elif len(sku_array) == 4:
+			premier, index_1, index_2, _size = sku_array
+			# T-Shirt SS / LS
+			if index_1[:2] == 'TS':
+				style = index_1[2:]
+				# TS-LS-201 / TS-SS-201
+				SS_or_LS_style = 'TS-' + index_2 + '-' + style
+				brand_and_style = premier + '-' + SS_or_LS_style
+			else:
+				style = index_1 + '-' + index_2
+				brand_and_style = premier + '-' + style
+			size = _size
+	#--- STEX
+	elif brand == 'STEX' or brand == 'STX':
+		stex, color, _size = sku_array
+		# add number so colors in pick list are ordered the same as colors in warehouse
+		if color == 'WHT':      stex = 'STEX4'
+		elif color == 'BRIT':   stex = 'STEX9'
+		elif color == 'GRN':    stex = 'STEX7'
+		elif color == 'CHAR':   stex = 'STEX1'
+		elif color == 'BLK':    stex = 'STEX3'
+		elif color == 'GREY':   stex = 'STEX8'
+		elif color == 'RED':    stex = 'STEX6'
+		elif color == 'NAVY':   stex = 'STEX2'
+		elif color == 'KAK':    stex = 'STEX5'
+		brand_and_style = stex + '-' + color
+		size = _size
+	#--- WICK SHORTS and WEAR SHORTS 
+	elif brand == 'WICK' or brand == 'WEAR':
+		wick, color, _size = sku_array
+		brand_and_style = wick + '-' + color
+		size = _size
+	#--- VESE and AMDS 
+	elif brand == 'VESE' or brand == 'AMDS':
+		# AMDS-RED-01-XL / VESE-GREEN-11-LRG
+		vese_or_amds, color, style, _size = sku_array
+		brand_and_style = vese_or_amds + '-' + style + '-' + color
+		size = _size
+	#--- CASUAL COUNTRY 
+	elif brand == 'CAS' or brand == 'CASS':
+		# CAS-PURP-01-LRG / CAS-NAV-3065-MED
+		if len(sku_array) == 4:
+			cas, color, style, _size = sku_array
+			# CAS-NAV-3065-MED
+			if style == '3065':
+				style = 'SOLID-3065'
+			brand_and_style = cas + '-' + style + '-' + color
+			size = _size
+		# CAS-SS-45-WHT-SML
+		elif len(sku_array) == 5:
+			cas, ss, style, color, _size = sku_array
+			brand_and_style = cas + '-' + ss + '-' + style + '-' + color
+			size = _size
+	#--- RODEO and ACE OF DIAMONDS 
+	elif brand == 'ROD' or brand == 'RODEO' or brand == 'ACE':
+		# RODEO-524-XL
+		if len(sku_array) == 3:
+			rodeo, style, _size = sku_array
+			brand_and_style = rodeo + '-' + style
+			size = _size
+		# RODEO-BEIG-533-MED, ROD-WOM-506-XL
+		elif len(sku_array) == 4:
+			rodeo_or_ace, color, style, _size = sku_array
+			# strip 'PS400' from SKUs: RODEO-BRWN-PS400461N-MED
+			if style[:5] == 'PS400':
+				style = style[5:]
+			# reorder big and tall SKUs: RODEO-RED-438BT -> RODEO-BT438-RED
+			if style[-2:] == 'BT':
+				style = style[-2:] + style[:3]
+			# missing hyphen on some SKUs
+			if style[:2] == 'ES':
+				ES = style[:2]
+				num = style[2:]
+				style = ES + '-' + num
+			# incorrect SKU: SS-2115 should be SS-2145
+			if color == 'SS2115':
+				color = style
+				style = 'SS-2145'
+			brand_and_style = rodeo_or_ace + '-' + style + '-' + color
+			size = _size
+		# ACE-WOM-BLU-ES5110-SML / ACE-HFK700-10-NVYBLU-3XL
+		elif len(sku_array) == 5:
+			# HFK700 / HFK200
+			if sku_array[1] == 'HFK700' or sku_array[1] == 'HFK200':
+				ace, hfk, style, color, _size = sku_array
+				if hfk[3:] == '200':
+					hfk = 'HFK-200'
+				if hfk[3:] == '700':
+					hfk = 'HFK-700'
+				brand_and_style = ace + '-' + hfk + '-' + style + '-' + color
+				size = _size
+			# WOMENS
+			else:
+				ace, women, color, style, _size = sku_array
+				brand_and_style = ace + '-' + women + '-' + style + '-' + color
+				size = _size
+	#--- BUCKEROO 
+	elif brand == 'BUCK':
+		# BUCK-WS6-BEGE/BRWN-LRG
+		if len(sku_array) == 4:
+			buck, style, color, _size = sku_array
+			brand_and_style = buck + '-' + style + '-' + color
+			size = _size
+		# BUCK-WS100-01-BLACK/BLUE-SML / BUCK-WS200-01-BLACK/BLUE-SML
+		elif len(sku_array) == 5:
+			buck, style, number, color, _size = sku_array
+			brand_and_style = buck + '-' + style + '-' + number + '-' + color
+			size = _size
+		# New Buckeroo LS/SS not in SKU MAP: ex) BUCK-WS200-SS-17-BURGBLK-XL
+		elif len(sku_array) == 6:
+			buck, style, LS_or_SS, number, color, _size = sku_array
+			brand_and_style = buck + '-' + style + '-' + number + '-' + color
+			size = _size
+	#--- VICTORIOUS, ENVY, and SOCIETY JEANS
+	elif brand == 'VIC' or brand == 'VICT' or brand == 'ENVY' or brand == 'SOCI':
+		# VICT-DK211-XL / ENVY-41030-SML
+		if len(sku_array) == 3:
+			vic_or_envy, style, _size = sku_array
+			brand_and_style = vic_or_envy + '-' + style
+			size = _size
+		# VICT-BLACK-1082-38X32 / ENVY-WHIT-18SS-XL / SOCI-BLU-80217-38X32
+		elif len(sku_array) == 4:
+			vic_or_envy_or_soci, color, style, _size = sku_array
+			brand_and_style = vic_or_envy_or_soci + '-' + style + '-' + color
+			size = _size
+		# ENVY-LACEUP-WHT-41028-SML
+		elif len(sku_array) == 5:
+			envy, lace, color, style, _size = sku_array
+			brand_and_style = envy + '-' + style + '-' + lace + '-' + color
+			size = _size
+		# VIC-100-DENIM-JACKET-DARK-INDIGO-XL
+		elif len(sku_array) == 7:
+			vic, style, denim, jacket, color1, color2, _size = sku_array
+			brand_and_style = vic + '-' + style + '-' + denim + '-' + jacket + '-' + color1 + '-' + color2
+			size = _size
+	#--- VASSARI, BENZINI, GAVEL, and STEELO
+	elif brand == 'VASS' or brand == 'BENZ' or brand == 'GAV' or brand == 'STEELO' or brand == 'BARA':
+		# ex: VASS-LEOP-VS135-SML
+		the_brand, color, style, _size = sku_array
+		# incorrect SKU: BARA-B339-WHT/BLK should be BARA-B339-SIL
+		if the_brand == 'BARA':
+			if style == 'B339' and color == 'WHT/BLK':
+				color = 'SIL'
+		brand_and_style = the_brand + '-' + style + '-' + color
+		size = _size
+	#--- CANYON OF HEROES and NORTH-15
+	elif brand == 'CAN' or brand == 'CANLADY':
+		can_or_n15, style, color, _size = sku_array
+		brand_and_style = can_or_n15 + '-' + style + '-' + color
+		size = _size
+	#--- EVERYTHING ELSE: remaining SKUs cannot be normalized
+	else:
+		return None
+
+	# the old chain failed here on a known brand whose layout no branch matched
+	if size is None:
+		raise TypeError('no layout of the brand matches')
+
+	if size == 'XXL':
+		size = '2XL'
+
+	return brand_and_style, size
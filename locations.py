@@ -0,0 +1,122 @@
+import os
+import csv
+from collections import namedtuple
+
+
+"""
+Warehouse locations of items and the order they are reached on the pick route.
+
+The location index file is a CSV with a header row: style,aisle,bay,shelf (shelf may be left empty), e.g.
+
+	style,aisle,bay,shelf
+	PREM-612,1,4,2
+	STEX3-BLK,1,5,
+	BUCK-WS100,3,1,1
+
+style is a normalized brand and style (a pick list entry); an entry also covers every longer style that starts with it
+followed by "-" (BUCK-WS100 covers BUCK-WS100-01-BLACK/BLUE). Aisles, bays, and shelves may be numbers or names.
+"""
+
+# location index kept next to the scripts; without it pick lists stay in alphanumeric order
+LOCATION_INDEX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'locations.csv')
+
+Location = namedtuple('Location', ['aisle', 'bay', 'shelf'])
+
+
+# helper: sort key that orders numbers numerically and before names ("2" < "10" < "A")
+def _natural(value):
+	if value.isdigit():
+		return (0, int(value), '')
+	return (1, 0, value)
+
+
+class LocationIndex:
+	"""
+	In-memory index of item locations, with each location's rank along a serpentine walk of the warehouse
+
+	The route walks the aisles in order, going up the bays of the first aisle, down the bays of the next, and so on,
+	so a picker never walks back to the front of an aisle. Shelves are picked bottom to top within a bay.
+
+		locations: 	dictionary of normalized brand and style to Location
+	"""
+
+	def __init__(self, locations):
+		self.locations = dict(locations)
+
+		aisles = sorted({location.aisle for location in self.locations.values()}, key=_natural)
+		bays = {aisle: set() for aisle in aisles}
+		for location in self.locations.values():
+			bays[location.aisle].add(location.bay)
+
+		# key : tuple (aisle, bay)
+		# val : int (position of the bay along the route)
+		stops = {}
+		for aisle_number, aisle in enumerate(aisles):
+			ordered_bays = sorted(bays[aisle], key=_natural, reverse=aisle_number % 2 == 1)
+			for bay in ordered_bays:
+				stops[(aisle, bay)] = len(stops)
+
+		# key : str (normalized brand and style)
+		# val : tuple (route position of the bay, shelf sort key)
+		self._ranks = {
+			style: (stops[(location.aisle, location.bay)], _natural(location.shelf))
+			for style, location in self.locations.items()
+		}
+		# memoized lookups, including prefix matches and misses
+		self._resolved = {}
+
+	def __len__(self):
+		return len(self.locations)
+
+	def _resolve(self, style):
+		try:
+			return self._resolved[style]
+		except KeyError:
+			pass
+		resolved = None
+		candidate = style
+		while True:
+			if candidate in self.locations:
+				resolved = candidate
+				break
+			cut = candidate.rfind('-')
+			if cut <= 0:
+				break
+			candidate = candidate[:cut]
+		self._resolved[style] = resolved
+		return resolved
+
+	def location(self, style):
+		"""
+		Returns the Location of a normalized brand and style (exact, else its longest indexed prefix), or None
+		"""
+		resolved = self._resolve(style)
+		return None if resolved is None else self.locations[resolved]
+
+	def route_rank(self, style):
+		"""
+		Returns the sort key of a normalized brand and style along the pick route, or None if it has no location
+		"""
+		resolved = self._resolve(style)
+		return None if resolved is None else self._ranks[resolved]
+
+
+def load(path=LOCATION_INDEX_FILE):
+	"""
+	Returns the LocationIndex of a location index file, or None if there is no such file
+	"""
+	if not os.path.isfile(path):
+		return None
+
+	locations = {}
+	with open(path, 'r', encoding='utf-8', newline='') as f:
+		for row in csv.DictReader(f):
+			style = (row.get('style') or '').strip()
+			if not style:
+				continue
+			locations[style] = Location(
+				row['aisle'].strip(),
+				row['bay'].strip(),
+				(row.get('shelf') or '').strip(),
+			)
+	return LocationIndex(locations)
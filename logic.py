@@ -1,62 +1,239 @@
-import requests
+import os
+import re
+import hashlib
+from functools import lru_cache
+from collections import namedtuple
+from operator import attrgetter, itemgetter
+
 from sku_map import MAP
+import instrument
+import render
+
+
+# number of buffered records before the log writer flushes to disk
+LOG_FLUSH_THRESHOLD = 1000
+
+
+class LogWriter:
+	"""
+	Buffers a run's log and order ID records in memory and writes them out in bulk; foreign orders are counted in memory
+
+		LOG_FILE: 		string of the name of the store's log file (truncated when the writer is opened)
+		order_id_store: OrderIdStore of the store's processed order IDs
+		foreign_orders: optional foreign_orders.ForeignOrders collecting the run's foreign order destinations (shared by
+						every store of a run, written once at the end of the run)
+		threshold: 		int number of buffered records that triggers a flush
+	"""
+
+	def __init__(self, LOG_FILE, order_id_store, foreign_orders=None, threshold=LOG_FLUSH_THRESHOLD):
+		self.threshold = threshold
+		self._log_records = []
+		self._id_records = []
+		self._pending = 0
+		self._order_id_store = order_id_store
+		self._foreign_orders = foreign_orders
 
+		# the log is opened once per run; create new empty log for each pick list
+		self._log_file = open(LOG_FILE, 'w', encoding='utf-8')
 
-# helper: append order number and customer name to log
-def _log_order_and_customer(order_num, cust_name, LOG_FILE):
-	with open(LOG_FILE, 'a', encoding='utf-8') as f:
-		f.write('+' + '-'*40 + '\n')
-		f.write('| ' + order_num + '\n')
-		f.write('| ' + cust_name + '\n')
+	def __enter__(self):
+		return self
 
-# helper: append SKU and its quantity to log
-def _log_sku_and_quantity(sku, quantity, LOG_FILE):
-	# quantity = int
-	with open(LOG_FILE, 'a', encoding='utf-8') as f:
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+	def _buffered(self):
+		self._pending += 1
+		if self._pending >= self.threshold:
+			self.flush()
+
+	# append order number and customer name to log
+	def log_order_and_customer(self, order_num, cust_name):
+		self._log_records.append('+' + '-'*40 + '\n| ' + order_num + '\n| ' + cust_name + '\n')
+		self._buffered()
+
+	# append SKU and its quantity to log
+	def log_sku_and_quantity(self, sku, quantity):
+		# quantity = int
 		if quantity > 1:
-			f.write('| ' + sku + ' (' + str(quantity) + ')' + '\n')
+			self._log_records.append('| ' + sku + ' (' + str(quantity) + ')' + '\n')
 		else:
-			f.write('| ' + sku + '\n')
+			self._log_records.append('| ' + sku + '\n')
+		self._buffered()
+
+	# add order number to the order ID store to mark it as not new
+	def log_order_id(self, order_num):
+		self._id_records.append(order_num)
+		self._buffered()
+
+	# count the order's destination for the foreign orders report (only for foreign orders)
+	def log_foreign_order(self, city, country):
+		if self._foreign_orders is not None:
+			self._foreign_orders.add(city, country)
+
+	def flush(self):
+		"""
+		Writes every buffered record with a single write per file and a single batched insert of order IDs
+		"""
+		with instrument.timer('file_io'):
+			self._flush()
+
+	def _flush(self):
+		if self._log_records:
+			self._log_file.write(''.join(self._log_records))
+			self._log_records.clear()
+		self._log_file.flush()
+		if self._id_records:
+			self._order_id_store.add_many(self._id_records)
+			self._id_records.clear()
+		self._pending = 0
+
+	def close(self):
+		if self._log_file.closed:
+			return
+		self.flush()
+		self._log_file.close()
+
+
+# change this when clean_sku or the normalization rule compiler changes, so cached results are discarded
+SKU_RULES_VERSION = 1
+
+
+def clean_sku(sku, description):
+	"""
+	Returns the cleaned SKU of an order item: revised through the SKU map, with obsolete suffixes stripped
 
-# helper: append google maps location link to HTML file (only for foreign orders)
-def _log_foreign_order(city, country, LOCATION_FILE):
-	g_maps = f'https://www.google.com/maps/place/{city},+{country}/'
+		sku: 			string (or None) of the item SKU from ShipStation
+		description: 	string of the item description that we provided, used when the SKU is missing or randomly generated
+	"""
+	if sku is None: 		 sku = description  # null
+	elif sku == '': 		 sku = description  # empty string
+	elif sku in MAP: 		 sku = MAP[sku]  	# revised SKU
+	elif sku[:3] == 'wi_': 	 sku = description  # randomly generated
+	elif sku[-3:] == '-SL':	 sku = sku[:-3]  	# obsolete
+	elif sku[-4:] == '-SLL': sku = sku[:-4]  	# obsolete
+	elif sku[-2:] == '-D': 	 sku = sku[:-2]  	# obsolete
+	elif sku[-2:] == '-2':	 sku = sku[:-2]		# new SKU for FBA
+	return sku
 
-	with open(LOCATION_FILE, 'a', encoding='utf-8') as f:
-		f.write(f'<h3><a href="{g_maps}">{city}, {country}</a><br></h3>' + '\n')
 
+# one parsed order: order number (eBay's orderKey), ShipStation order number, customer name, list of [cleaned SKU, int
+# quantity] items, ship to city and country, and customer key (see customer_key); only what the pick list, log, and
+# reports need from an order's JSON
+OrderRecord = namedtuple(
+	'OrderRecord', ['order_num', 'order_number', 'cust_name', 'items', 'city', 'country', 'customer_key'], defaults=(None,)
+)
 
-def parse_awaiting_shipment_order_data(
-	awaiting_shipment_orders_list,
+_NOT_WORD = re.compile(r'[^\w]+')
+
+# ship to fields that identify an address
+ADDRESS_FIELDS = ('street1', 'street2', 'city', 'state', 'postalCode', 'country')
+
+
+def normalize_name(name):
+	"""
+	Returns a name with case, punctuation, and spacing differences removed ("  John  DOE. " -> "john doe")
+	"""
+	return ' '.join(_NOT_WORD.sub(' ', (name or '').casefold()).split())
+
+
+def address_hash(ship_to):
+	"""
+	Returns a short hash of a ship to address with case, punctuation, and spacing differences removed (ZIP+4 is cut to
+	the 5 digit ZIP code)
+	"""
+	fields = []
+	for field in ADDRESS_FIELDS:
+		value = ship_to.get(field) or ''
+		if field == 'postalCode':
+			value = value[:5]
+		fields.append(normalize_name(value))
+	return hashlib.sha1('|'.join(fields).encode('utf-8')).hexdigest()[:16]
+
+
+def customer_key(name, ship_to):
+	"""
+	Returns the key of orders that can ship together: normalized customer name and ship to address hash
+	"""
+	return normalize_name(name) + '|' + address_hash(ship_to)
+
+
+def order_num_of(order, is_ebay):
+	"""
+	Returns the order number used for order IDs and logs
+	"""
+	# ShipStation API uses "orderKey" for eBay's updated order number and "orderNumber" for eBay's former serial order numbers
+	if is_ebay:  return order['orderKey']
+	else: 		 return order['orderNumber']
+
+
+def store_id_of(order):
+	"""
+	Returns the ShipStation store ID of an order as a string (List Orders only carries it in "advancedOptions")
+	"""
+	return str(order['advancedOptions']['storeId'])
+
+
+def summarize_order(order, is_ebay, sku_cache=None):
+	"""
+	Returns the OrderRecord of one order's JSON dictionary, with every SKU cleaned
+
+		order: 		JSON dictionary of the order
+		is_ebay: 	boolean to flag if currently processing orders from eBay
+		sku_cache: 	optional SkuCache memoizing SKU cleaning
+	"""
+	items = []
+	mapped = 0
+	for item in order['items']:
+		sku = item['sku']
+		if sku in MAP:
+			mapped += 1
+		description = item['name']   # item description that we provided
+		quantity = item['quantity']  # this is an int
+
+		# Clean the SKU
+		if sku_cache is None:
+			sku = clean_sku(sku, description)
+		else:
+			sku = sku_cache.clean_sku(sku, description)
+
+		items.append([sku, quantity])
+
+	# revised SKUs are rare, so the counter is only touched when there is one
+	if mapped:
+		instrument.count('skus_mapped', mapped)
+
+	ship_to = order['shipTo']
+	cust_name = order['billTo']['name']
+	return OrderRecord(
+		order_num_of(order, is_ebay), order['orderNumber'], cust_name, items, ship_to['city'], ship_to['country'],
+		customer_key(cust_name, ship_to)
+	)
+
+
+def parse_order_records(
+	order_records,
 	customer_name_more_than_one_dict,
 	order_id_set,
-	LOG_FILE,
+	log_writer,
 	item_quantity_more_than_one_dict,
-	ID_FILE,
-	LOCATION_FILE,
-	new_orders_dict,
-	is_ebay
+	new_orders_dict
 ):
 	"""
-	Parses JSON data of customers’ orders
+	Parses already summarized orders (see summarize_order); arguments as in parse_awaiting_shipment_order_data
 
-		awaiting_shipment_orders_list: 		list of JSON dictionaries
-		customer_name_more_than_one_dict: 	dictionary to keep track of a customers with multiple orders
-		order_id_set: 						set of current batch of order IDs
-		LOG_FILE: 							string of the name of the store's log file
-		item_quantity_more_than_one_dict: 	dictionary to keep track if customer purchased more than one of a unique item
-		ID_FILE: 							string of the name of the store's order ID file
-		LOCATION_FILE: 						string of the name of the HTML file for foreign orders
-		new_orders_dict: 					dictionary to keep track of items from the current batch of order IDs
-		is_ebay: 							boolean to flag if currently processing orders from eBay
+	Returns the number of orders parsed
 	"""
 
-	# ShipStation API uses "orderKey" for eBay's updated order number and "orderNumber" for eBay's former serial order numbers
-	for order in awaiting_shipment_orders_list:
-		if is_ebay:  order_num = order['orderKey']
-		else: 		 order_num = order['orderNumber']
+	number_of_orders = 0
+	number_of_items = 0
+	number_of_new_orders = 0
+	number_of_foreign_orders = 0
 
-		cust_name = order['billTo']['name']
+	for record in order_records:
+		order_num = record.order_num
+		cust_name = record.cust_name
+		number_of_orders += 1
 
 		# keep track of customer name for each order to flag a customer with multiple orders (to combine shipping)
 		if cust_name not in customer_name_more_than_one_dict:
@@ -64,26 +241,14 @@ def parse_awaiting_shipment_order_data(
 		else:
 			customer_name_more_than_one_dict[cust_name] += 1
 
-		_log_order_and_customer(order_num, cust_name, LOG_FILE)
-		
-		items_list = order['items']  # list of dictionaries
-		
-		for item in items_list:
-			sku = item['sku']
-			description = item['name']   # item description that we provided
-			quantity = item['quantity']  # this is an int
-
-			# Clean the SKU
-			if sku is None: 		 sku = description  # null
-			elif sku == '': 		 sku = description  # empty string
-			elif sku in MAP: 		 sku = MAP[sku]  	# revised SKU
-			elif sku[:3] == 'wi_': 	 sku = description  # randomly generated
-			elif sku[-3:] == '-SL':	 sku = sku[:-3]  	# obsolete
-			elif sku[-4:] == '-SLL': sku = sku[:-4]  	# obsolete
-			elif sku[-2:] == '-D': 	 sku = sku[:-2]  	# obsolete
-			elif sku[-2:] == '-2':	 sku = sku[:-2]		# new SKU for FBA
-			
-			_log_sku_and_quantity(sku, quantity, LOG_FILE)
+		log_writer.log_order_and_customer(order_num, cust_name)
+
+		is_new_order = order_num not in order_id_set
+		number_of_new_orders += is_new_order
+		number_of_items += len(record.items)
+
+		for sku, quantity in record.items:
+			log_writer.log_sku_and_quantity(sku, quantity)
 
 			# for Amazon only check if customer purchased more than one of a unique item
 			if quantity > 1:
@@ -98,329 +263,571 @@ def parse_awaiting_shipment_order_data(
 					item_quantity_more_than_one_dict[order_num].append(cust_sku_quant)
 
 			# add only new items to pick list
-			if order_num not in order_id_set:
+			if is_new_order:
 				if sku not in new_orders_dict:
 					new_orders_dict[sku] = quantity
 				else:
 					new_orders_dict[sku] += quantity
 
-		# add foreign city and country to HTML file 
-		if order_num not in order_id_set:
-			if order['shipTo']['country'] != 'US':
-				city = order['shipTo']['city']
-				country = order['shipTo']['country']
-				_log_foreign_order(city, country, LOCATION_FILE)
+		# count foreign city and country for the foreign orders report
+		if is_new_order:
+			if record.country != 'US':
+				log_writer.log_foreign_order(record.city, record.country)
+				number_of_foreign_orders += 1
 
 		# add the order ID to ID file to mark it as not new
-		with open(ID_FILE, 'a') as f:
-			f.write(order_num + ',')
+		log_writer.log_order_id(order_num)
+
+	instrument.count('orders', number_of_orders)
+	instrument.count('line_items', number_of_items)
+	instrument.count('new_order_ids', number_of_new_orders)
+	instrument.count('seen_order_ids', number_of_orders - number_of_new_orders)
+	instrument.count('foreign_orders', number_of_foreign_orders)
 
+	return number_of_orders
 
-def clean_and_normalize_order_data(new_orders_dict, cleaned_orders_dict):
+
+def parse_awaiting_shipment_order_data(
+	awaiting_shipment_orders_list,
+	customer_name_more_than_one_dict,
+	order_id_set,
+	log_writer,
+	item_quantity_more_than_one_dict,
+	new_orders_dict,
+	is_ebay,
+	sku_cache=None
+):
+	"""
+	Parses JSON data of customers’ orders
+
+		awaiting_shipment_orders_list: 		iterable of JSON dictionaries (e.g. a list or a paginated order stream)
+		customer_name_more_than_one_dict: 	dictionary to keep track of a customers with multiple orders
+		order_id_set: 						set-like container (e.g. OrderIdStore) of previously processed order IDs
+		log_writer: 						LogWriter buffering the store's log, order ID, and foreign order records
+		item_quantity_more_than_one_dict: 	dictionary to keep track if customer purchased more than one of a unique item
+		new_orders_dict: 					dictionary to keep track of items from the current batch of order IDs
+		is_ebay: 							boolean to flag if currently processing orders from eBay
+		sku_cache: 							optional SkuCache memoizing SKU cleaning
+
+	Returns the number of orders parsed
+	"""
+
+	return parse_order_records(
+		(summarize_order(order, is_ebay, sku_cache) for order in awaiting_shipment_orders_list),
+		customer_name_more_than_one_dict,
+		order_id_set,
+		log_writer,
+		item_quantity_more_than_one_dict,
+		new_orders_dict
+	)
+
+
+def new_orders_of(records, order_id_set):
+	"""
+	Returns (dictionary of SKU to quantity of the orders not in order_id_set, number of such orders), as parse_order_records
+	builds its new_orders_dict but without logging or marking any order
+
+		records: 		iterable of OrderRecords
+		order_id_set: 	set-like container (e.g. OrderIdStore) of previously processed order IDs
+	"""
+	new_orders_dict = {}
+	number_of_new = 0
+	for record in records:
+		if record.order_num in order_id_set:
+			continue
+		number_of_new += 1
+		for sku, quantity in record.items:
+			new_orders_dict[sku] = new_orders_dict.get(sku, 0) + quantity
+	return new_orders_dict, number_of_new
+
+
+# STEX colors get a number so colors in pick list are ordered the same as colors in warehouse
+STEX_COLOR_ORDER = {
+	'CHAR': 'STEX1',
+	'NAVY': 'STEX2',
+	'BLK': 'STEX3',
+	'WHT': 'STEX4',
+	'KAK': 'STEX5',
+	'RED': 'STEX6',
+	'GRN': 'STEX7',
+	'GREY': 'STEX8',
+	'BRIT': 'STEX9',
+}
+
+# sizes written more than one way
+SIZE_ALIASES = {'XXL': '2XL'}
+
+# Normalization rules, one per brand and number of SKU segments ("PREM-612-XL" has 3 segments; the last is always the size)
+#
+#	brands: 		brand prefixes (first segment) the rule applies to
+#	segments: 		number of segments in the SKU
+#	when: 			optional {segment index: regex} that must all match, for brands with two layouts of the same length
+#	fixes: 			optional {segment index: [(test, literal, prefix, slice), ...]} applied in order:
+#					if segment.test(literal) is true the segment becomes prefix + segment[slice] (test is 'startswith' or 'endswith')
+#	lookups: 		optional {segment index: (source segment index, dictionary)}: segment = dictionary.get(source, segment)
+#	corrections: 	optional [({segment index: value}, {segment index: new value}), ...] for known incorrect SKUs;
+#					an int new value copies that segment (as it was before the correction)
+#	order: 			segment indexes joined with "-" to make the normalized brand and style
+NORMALIZATION_RULES = [
+	#--- PREMIER
+	# PREM-646-MED, PREM-631NEW-LRG -> PREM-631, PREM-210P-5XL
+	{'brands': ('PREM',), 'segments': 3, 'order': (0, 1), 'fixes': {1: [('endswith', 'NEW', '', slice(0, 3))]}},
+	# T-Shirt SS / LS: PREM-TS201-LS-SML -> PREM-TS-LS-201
+	{'brands': ('PREM',), 'segments': 4, 'when': {1: r'^TS'}, 'order': (0, 2, 1), 'fixes': {1: [('startswith', 'TS', '', slice(2, None))], 2: [('startswith', '', 'TS-', slice(None))]}},
+	# PREM-618-RED-MED, PREM-SS-101-LRG
+	{'brands': ('PREM',), 'segments': 4, 'order': (0, 1, 2)},
+	#--- STEX: STEX-BLK-LRG -> STEX3-BLK
+	{'brands': ('STEX', 'STX'), 'segments': 3, 'order': (0, 1), 'lookups': {0: (1, STEX_COLOR_ORDER)}},
+	#--- WICK SHORTS and WEAR SHORTS
+	{'brands': ('WICK', 'WEAR'), 'segments': 3, 'order': (0, 1)},
+	#--- VESE and AMDS: AMDS-RED-01-XL -> AMDS-01-RED
+	{'brands': ('VESE', 'AMDS'), 'segments': 4, 'order': (0, 2, 1)},
+	#--- CASUAL COUNTRY
+	# CAS-PURP-01-LRG -> CAS-01-PURP, CAS-NAV-3065-MED -> CAS-SOLID-3065-NAV
+	{'brands': ('CAS', 'CASS'), 'segments': 4, 'order': (0, 2, 1), 'lookups': {2: (2, {'3065': 'SOLID-3065'})}},
+	# CAS-SS-45-WHT-SML
+	{'brands': ('CAS', 'CASS'), 'segments': 5, 'order': (0, 1, 2, 3)},
+	#--- RODEO and ACE OF DIAMONDS
+	# RODEO-524-XL
+	{'brands': ('ROD', 'RODEO', 'ACE'), 'segments': 3, 'order': (0, 1)},
+	# RODEO-BEIG-533-MED -> RODEO-533-BEIG
+	{
+		'brands': ('ROD', 'RODEO', 'ACE'), 'segments': 4, 'order': (0, 2, 1),
+		'fixes': {2: [
+			('startswith', 'PS400', '', slice(5, None)),  	# strip 'PS400' from SKUs: RODEO-BRWN-PS400461N-MED
+			('endswith', 'BT', 'BT', slice(0, 3)),  		# reorder big and tall SKUs: RODEO-RED-438BT -> RODEO-BT438-RED
+			('startswith', 'ES', 'ES-', slice(2, None)),  	# missing hyphen on some SKUs
+		]},
+		# incorrect SKU: SS-2115 should be SS-2145
+		'corrections': [({1: 'SS2115'}, {1: 2, 2: 'SS-2145'})],
+	},
+	# ACE-HFK700-10-NVYBLU-3XL -> ACE-HFK-700-10-NVYBLU
+	{
+		'brands': ('ROD', 'RODEO', 'ACE'), 'segments': 5, 'when': {1: r'^(HFK700|HFK200)$'}, 'order': (0, 1, 2, 3),
+		'lookups': {1: (1, {'HFK700': 'HFK-700', 'HFK200': 'HFK-200'})},
+	},
+	# WOMENS: ACE-WOM-BLU-ES5110-SML -> ACE-WOM-ES5110-BLU
+	{'brands': ('ROD', 'RODEO', 'ACE'), 'segments': 5, 'order': (0, 1, 3, 2)},
+	#--- BUCKEROO
+	# BUCK-WS6-BEGE/BRWN-LRG
+	{'brands': ('BUCK',), 'segments': 4, 'order': (0, 1, 2)},
+	# BUCK-WS100-01-BLACK/BLUE-SML
+	{'brands': ('BUCK',), 'segments': 5, 'order': (0, 1, 2, 3)},
+	# New Buckeroo LS/SS not in SKU MAP: BUCK-WS200-SS-17-BURGBLK-XL -> BUCK-WS200-17-BURGBLK
+	{'brands': ('BUCK',), 'segments': 6, 'order': (0, 1, 3, 4)},
+	#--- VICTORIOUS, ENVY, and SOCIETY JEANS
+	# VICT-DK211-XL / ENVY-41030-SML
+	{'brands': ('VIC', 'VICT', 'ENVY', 'SOCI'), 'segments': 3, 'order': (0, 1)},
+	# VICT-BLACK-1082-38X32 -> VICT-1082-BLACK
+	{'brands': ('VIC', 'VICT', 'ENVY', 'SOCI'), 'segments': 4, 'order': (0, 2, 1)},
+	# ENVY-LACEUP-WHT-41028-SML -> ENVY-41028-LACEUP-WHT
+	{'brands': ('VIC', 'VICT', 'ENVY', 'SOCI'), 'segments': 5, 'order': (0, 3, 1, 2)},
+	# VIC-100-DENIM-JACKET-DARK-INDIGO-XL
+	{'brands': ('VIC', 'VICT', 'ENVY', 'SOCI'), 'segments': 7, 'order': (0, 1, 2, 3, 4, 5)},
+	#--- VASSARI, BENZINI, GAVEL, STEELO, and BARA: VASS-LEOP-VS135-SML -> VASS-VS135-LEOP
+	{
+		'brands': ('VASS', 'BENZ', 'GAV', 'STEELO', 'BARA'), 'segments': 4, 'order': (0, 2, 1),
+		# incorrect SKU: BARA-B339-WHT/BLK should be BARA-B339-SIL
+		'corrections': [({0: 'BARA', 1: 'WHT/BLK', 2: 'B339'}, {1: 'SIL'})],
+	},
+	#--- CANYON OF HEROES and NORTH-15
+	{'brands': ('CAN', 'CANLADY'), 'segments': 4, 'order': (0, 1, 2)},
+]
+
+
+# helper: compile one rule into a transform that takes the SKU segments and returns (brand_and_style, size), or None if
+# the segments do not match the rule's "when" patterns
+def _compile_rule(rule):
+	pick = itemgetter(*rule['order'])
+	when = [(i, re.compile(pattern).search) for i, pattern in rule.get('when', {}).items()]
+	fixes = [(i, getattr(str, test), literal, prefix, part) for i, subs in rule.get('fixes', {}).items() for test, literal, prefix, part in subs]
+	lookups = list(rule.get('lookups', {}).items())
+	# a correction is (getter of the tested segments, their expected values, updates); an update is (segment index, index
+	# of the segment to copy or None, new value)
+	corrections = [
+		(
+			itemgetter(*conditions), tuple(conditions.values()) if len(conditions) > 1 else next(iter(conditions.values())),
+			[(i, value if type(value) is int else None, value) for i, value in updates.items()],
+		)
+		for conditions, updates in rule.get('corrections', [])
+	]
+
+	def simple_transform(segments):
+		size = segments[-1]
+		return '-'.join(pick(segments)), SIZE_ALIASES.get(size, size)
+
+	def guarded_simple_transform(segments):
+		for i, search in when:
+			if not search(segments[i]):
+				return None
+		size = segments[-1]
+		return '-'.join(pick(segments)), SIZE_ALIASES.get(size, size)
+
+	# segments is the fresh list from str.split, so it is updated in place
+	def transform(segments):
+		for i, search in when:
+			if not search(segments[i]):
+				return None
+		for i, test, literal, prefix, part in fixes:
+			if test(segments[i], literal):
+				segments[i] = prefix + segments[i][part]
+		for i, (source, mapping) in lookups:
+			segments[i] = mapping.get(segments[source], segments[i])
+		for tested, expected, updates in corrections:
+			if tested(segments) == expected:
+				# copied segments are read before any is overwritten
+				values = [segments[source] if source is not None else value for _i, source, value in updates]
+				for (i, _source, _value), value in zip(updates, values):
+					segments[i] = value
+		size = segments[-1]
+		return '-'.join(pick(segments)), SIZE_ALIASES.get(size, size)
+
+	if fixes or lookups or corrections:
+		return transform
+	return guarded_simple_transform if when else simple_transform
+
+
+# helper: one transform for SKUs matching several rules; returns the result of the first rule whose patterns match
+def _first_matching(transforms):
+	def transform(segments):
+		for variant_transform in transforms:
+			result = variant_transform(segments)
+			if result is not None:
+				return result
+		return None
+	return transform
+
+
+# helper: dispatch table of (brand, number of segments) to the transform for those SKUs
+def _compile_rules(rules):
+	variants = {}
+	for rule in rules:
+		transform = _compile_rule(rule)
+		for brand in rule['brands']:
+			variants.setdefault((brand, rule['segments']), []).append(transform)
+
+	return {key: transforms[0] if len(transforms) == 1 else _first_matching(transforms) for key, transforms in variants.items()}
+
+
+NORMALIZATION_TABLE = _compile_rules(NORMALIZATION_RULES)
+
+
+def normalize_sku(SKU):
+	"""
+	Returns the (brand_and_style, size) of a SKU using the normalization rules, or None if the SKU cannot be normalized
+
+		SKU: 	string of the cleaned SKU (example: "PREM-612-XL" -> ("PREM-612", "XL"))
+	"""
+	sku_array = SKU.split('-')
+	transform = NORMALIZATION_TABLE.get((sku_array[0], len(sku_array)))
+	return transform(sku_array) if transform is not None else None
+
+
+# one pick list entry: normalized brand and style, size (None if the SKU cannot be normalized), size sort key, int quantity,
+# and for a combined multi-store pick list the per-store quantities as a tuple of (store label, int quantity)
+PickItem = namedtuple('PickItem', ['style', 'size', 'size_rank', 'quantity', 'stores'], defaults=(None,))
+
+# letter sizes and their spellings; need to sort by clothing size
+LETTER_SIZES = {
+	'XXXS': -2,
+	'XXS': -1,
+	'XS': 0, 'XSM': 0, 'XSML': 0,
+	'S': 1, 'SM': 1, 'SML': 1, 'SMALL': 1,
+	'M': 2, 'MD': 2, 'MED': 2, 'MEDIUM': 2,
+	'L': 3, 'LG': 3, 'LRG': 3, 'LARG': 3, 'LARGE': 3,
+	'XL': 4,
+}
+
+# 2XL, 2X, XXL, XXXL, ... (ranked after XL by their number of X's); the L is required after repeated X's, so the "XX" of
+# "XXS" is never taken for 2XL
+EXTENDED_SIZE = re.compile(r'^(?:([2-9])XL?|X(X+)L)$')
+
+# numeric waist with an optional inseam: 38, 38X32
+WAIST_INSEAM_SIZE = re.compile(r'^(\d{2})(?:X(\d{2}))?$')
+
+
+# helper: sort key of a complete size token, or None if it is not a size we know
+def _parse_size(size):
+	if size in LETTER_SIZES:
+		return (0, LETTER_SIZES[size], 0)
+	m = EXTENDED_SIZE.match(size)
+	if m:
+		number, extra_xs = m.groups()
+		return (0, LETTER_SIZES['XL'] + (int(number) - 1 if number else len(extra_xs)), 0)
+	m = WAIST_INSEAM_SIZE.match(size)
+	if m:
+		waist, inseam = m.groups()
+		return (1, int(waist), int(inseam or 0))
+	return None
+
+
+@lru_cache(maxsize=1024)
+def size_sort_key(size):
+	"""
+	Returns the sort key of a size: letter sizes (XXS < XS < SML < MED < LRG < XL < 2XL ...) before waists, waists by inseam
+
+	A size with an unknown ending sorts with its longest known prefix (e.g. "XLT" with "XL"), and a size with no known
+	prefix sorts after every known size, so an unfamiliar size never aborts the run. Ties are broken by the size string.
+	"""
+	for end in range(len(size), 0, -1):
+		key = _parse_size(size[:end])
+		if key is not None:
+			return key + (size,)
+	return (2, 0, 0, size)
+
+
+# SKUs to normalize (not already cached) before normalization is spread over a process pool; below it the pool's start up
+# costs more than it saves
+PARALLEL_NORMALIZE_THRESHOLD = 50000
+
+# worker processes of the normalization pool (None: one per CPU)
+PARALLEL_NORMALIZE_WORKERS = None
+
+# shards per worker, so a slow shard does not hold up the whole batch
+SHARDS_PER_WORKER = 4
+
+
+# helper: worker side of normalize_skus_parallel
+def _normalize_shard(SKUs):
+	return [normalize_sku(SKU) for SKU in SKUs]
+
+
+def normalize_skus_parallel(SKUs, workers=PARALLEL_NORMALIZE_WORKERS):
+	"""
+	Normalizes SKUs on a process pool; returns a dictionary of SKU to normalize_sku's result
+
+	SKUs are split into contiguous shards and the results are collected in shard order, so the result is the same as
+	normalizing them one by one.
+	"""
+	SKUs = list(SKUs)
+	workers = workers or os.cpu_count() or 1
+	shard_size = -(-len(SKUs) // (workers * SHARDS_PER_WORKER)) or 1
+	shards = [SKUs[i:i + shard_size] for i in range(0, len(SKUs), shard_size)]
+
+	# imported here: multiprocessing is slow to import and only large batches need it
+	from concurrent.futures import ProcessPoolExecutor
+
+	normalized_by_sku = {}
+	with ProcessPoolExecutor(max_workers=workers) as executor:
+		for shard, results in zip(shards, executor.map(_normalize_shard, shards)):
+			normalized_by_sku.update(zip(shard, results))
+	return normalized_by_sku
+
+
+def clean_and_normalize_order_data(
+	new_orders_dict,
+	cleaned_orders_dict,
+	sku_cache=None,
+	workers=PARALLEL_NORMALIZE_WORKERS,
+	threshold=PARALLEL_NORMALIZE_THRESHOLD
+):
 	"""
 	Cleans and standardizes all SKUs in current batch of orders
 
 		new_orders_dict: 		dictionary with SKU string as key and its quantity int as value (example entry: "PREM-612-XL": 1)
-		cleaned_orders_dict : 	dictionary to keep track of cleaned SKUs
-	"""
-
-	# Each order added to the list will be a tuple of (str (SKU), int (quantity))
-	for item, quantity in new_orders_dict.items():
-		SKU = item
-		sku_array = SKU.split('-')
-		brand = sku_array[0]
-
-		brand_and_style = None
-		size = None
-
-		#--- PREMIER
-		if brand == 'PREM':
-			# PREM-646-MED, PREM-631NEW-LRG, PREM-210P-5XL
-			if len(sku_array) == 3:
-				premier, style, _size = sku_array
-				# PREM-631NEW-XL
-				if style[-3:] == 'NEW':
-					style = style[:3]
-				brand_and_style = premier + '-' + style
-				size = _size
-			# PREM-618-RED-MED, PREM-SS-101-LRG, PREM-TS201-LS-SML, PREM-TS201-SS-SML
-			elif len(sku_array) == 4:
-				premier, index_1, index_2, _size = sku_array
-				# T-Shirt SS / LS
-				if index_1[:2] == 'TS':
-					style = index_1[2:]
-					# TS-LS-201 / TS-SS-201
-					SS_or_LS_style = 'TS-' + index_2 + '-' + style
-					brand_and_style = premier + '-' + SS_or_LS_style
-				else:
-					style = index_1 + '-' + index_2
-					brand_and_style = premier + '-' + style
-				size = _size
-		#--- STEX
-		elif brand == 'STEX' or brand == 'STX':
-			stex, color, _size = sku_array
-			# add number so colors in pick list are ordered the same as colors in warehouse
-			if color == 'WHT':      stex = 'STEX4'
-			elif color == 'BRIT':   stex = 'STEX9'
-			elif color == 'GRN':    stex = 'STEX7'
-			elif color == 'CHAR':   stex = 'STEX1'
-			elif color == 'BLK':    stex = 'STEX3'
-			elif color == 'GREY':   stex = 'STEX8'
-			elif color == 'RED':    stex = 'STEX6'
-			elif color == 'NAVY':   stex = 'STEX2'
-			elif color == 'KAK':    stex = 'STEX5'
-			brand_and_style = stex + '-' + color
-			size = _size
-		#--- WICK SHORTS and WEAR SHORTS 
-		elif brand == 'WICK' or brand == 'WEAR':
-			wick, color, _size = sku_array
-			brand_and_style = wick + '-' + color
-			size = _size
-		#--- VESE and AMDS 
-		elif brand == 'VESE' or brand == 'AMDS':
-			# AMDS-RED-01-XL / VESE-GREEN-11-LRG
-			vese_or_amds, color, style, _size = sku_array
-			brand_and_style = vese_or_amds + '-' + style + '-' + color
-			size = _size
-		#--- CASUAL COUNTRY 
-		elif brand == 'CAS' or brand == 'CASS':
-			# CAS-PURP-01-LRG / CAS-NAV-3065-MED
-			if len(sku_array) == 4:
-				cas, color, style, _size = sku_array
-				# CAS-NAV-3065-MED
-				if style == '3065':
-					style = 'SOLID-3065'
-				brand_and_style = cas + '-' + style + '-' + color
-				size = _size
-			# CAS-SS-45-WHT-SML
-			elif len(sku_array) == 5:
-				cas, ss, style, color, _size = sku_array
-				brand_and_style = cas + '-' + ss + '-' + style + '-' + color
-				size = _size
-		#--- RODEO and ACE OF DIAMONDS 
-		elif brand == 'ROD' or brand == 'RODEO' or brand == 'ACE':
-			# RODEO-524-XL
-			if len(sku_array) == 3:
-				rodeo, style, _size = sku_array
-				brand_and_style = rodeo + '-' + style
-				size = _size
-			# RODEO-BEIG-533-MED, ROD-WOM-506-XL
-			elif len(sku_array) == 4:
-				rodeo_or_ace, color, style, _size = sku_array
-				# strip 'PS400' from SKUs: RODEO-BRWN-PS400461N-MED
-				if style[:5] == 'PS400':
-					style = style[5:]
-				# reorder big and tall SKUs: RODEO-RED-438BT -> RODEO-BT438-RED
-				if style[-2:] == 'BT':
-					style = style[-2:] + style[:3]
-				# missing hyphen on some SKUs
-				if style[:2] == 'ES':
-					ES = style[:2]
-					num = style[2:]
-					style = ES + '-' + num
-				# incorrect SKU: SS-2115 should be SS-2145
-				if color == 'SS2115':
-					color = style
-					style = 'SS-2145'
-				brand_and_style = rodeo_or_ace + '-' + style + '-' + color
-				size = _size
-			# ACE-WOM-BLU-ES5110-SML / ACE-HFK700-10-NVYBLU-3XL
-			elif len(sku_array) == 5:
-				# HFK700 / HFK200
-				if sku_array[1] == 'HFK700' or sku_array[1] == 'HFK200':
-					ace, hfk, style, color, _size = sku_array
-					if hfk[3:] == '200':
-						hfk = 'HFK-200'
-					if hfk[3:] == '700':
-						hfk = 'HFK-700'
-					brand_and_style = ace + '-' + hfk + '-' + style + '-' + color
-					size = _size
-				# WOMENS
-				else:
-					ace, women, color, style, _size = sku_array
-					brand_and_style = ace + '-' + women + '-' + style + '-' + color
-					size = _size
-		#--- BUCKEROO 
-		elif brand == 'BUCK':
-			# BUCK-WS6-BEGE/BRWN-LRG
-			if len(sku_array) == 4:
-				buck, style, color, _size = sku_array
-				brand_and_style = buck + '-' + style + '-' + color
-				size = _size
-			# BUCK-WS100-01-BLACK/BLUE-SML / BUCK-WS200-01-BLACK/BLUE-SML
-			elif len(sku_array) == 5:
-				buck, style, number, color, _size = sku_array
-				brand_and_style = buck + '-' + style + '-' + number + '-' + color
-				size = _size
-			# New Buckeroo LS/SS not in SKU MAP: ex) BUCK-WS200-SS-17-BURGBLK-XL
-			elif len(sku_array) == 6:
-				buck, style, LS_or_SS, number, color, _size = sku_array
-				brand_and_style = buck + '-' + style + '-' + number + '-' + color
-				size = _size
-		#--- VICTORIOUS, ENVY, and SOCIETY JEANS
-		elif brand == 'VIC' or brand == 'VICT' or brand == 'ENVY' or brand == 'SOCI':
-			# VICT-DK211-XL / ENVY-41030-SML
-			if len(sku_array) == 3:
-				vic_or_envy, style, _size = sku_array
-				brand_and_style = vic_or_envy + '-' + style
-				size = _size
-			# VICT-BLACK-1082-38X32 / ENVY-WHIT-18SS-XL / SOCI-BLU-80217-38X32
-			elif len(sku_array) == 4:
-				vic_or_envy_or_soci, color, style, _size = sku_array
-				brand_and_style = vic_or_envy_or_soci + '-' + style + '-' + color
-				size = _size
-			# ENVY-LACEUP-WHT-41028-SML
-			elif len(sku_array) == 5:
-				envy, lace, color, style, _size = sku_array
-				brand_and_style = envy + '-' + style + '-' + lace + '-' + color
-				size = _size
-			# VIC-100-DENIM-JACKET-DARK-INDIGO-XL
-			elif len(sku_array) == 7:
-				vic, style, denim, jacket, color1, color2, _size = sku_array
-				brand_and_style = vic + '-' + style + '-' + denim + '-' + jacket + '-' + color1 + '-' + color2
-				size = _size
-		#--- VASSARI, BENZINI, GAVEL, and STEELO
-		elif brand == 'VASS' or brand == 'BENZ' or brand == 'GAV' or brand == 'STEELO' or brand == 'BARA':
-			# ex: VASS-LEOP-VS135-SML
-			the_brand, color, style, _size = sku_array
-			# incorrect SKU: BARA-B339-WHT/BLK should be BARA-B339-SIL
-			if the_brand == 'BARA':
-				if style == 'B339' and color == 'WHT/BLK':
-					color = 'SIL'
-			brand_and_style = the_brand + '-' + style + '-' + color
-			size = _size
-		#--- CANYON OF HEROES and NORTH-15
-		elif brand == 'CAN' or brand == 'CANLADY':
-			can_or_n15, style, color, _size = sku_array
-			brand_and_style = can_or_n15 + '-' + style + '-' + color
-			size = _size
-		#--- EVERYTHING ELSE: remaining SKUs cannot be normalized
-		else:
-			cleaned_orders_dict[SKU] = str(quantity)
-			continue
+		cleaned_orders_dict : 	dictionary of "brand-style" string (or the SKU if it cannot be normalized) to a list of PickItems
+		sku_cache: 				optional SkuCache memoizing SKU normalization
+		workers: 				int number of worker processes when normalizing in parallel (None: one per CPU, 1: never)
+		threshold: 				int number of SKUs to normalize (not already cached) from which they are normalized in parallel
+
+	Large batches (e.g. a backfill of several days) are normalized on a process pool (see normalize_skus_parallel), then
+	the PickItems are built here in the batch's order, so the result is the same as the serial path.
+	"""
+
+	normalize = normalize_sku if sku_cache is None else sku_cache.normalize_sku
+	unnormalizable = 0
+
+	workers = workers or os.cpu_count() or 1
+	if workers > 1 and len(new_orders_dict) >= threshold:
+		pending = list(new_orders_dict) if sku_cache is None else sku_cache.missing_normalized(new_orders_dict)
+		if len(pending) >= threshold:
+			with instrument.timer('normalize_parallel'):
+				normalized_by_sku = normalize_skus_parallel(pending, workers)
+			if sku_cache is None:
+				normalize = normalized_by_sku.__getitem__
+			else:
+				sku_cache.add_normalized(normalized_by_sku)
+				cached = sku_cache.normalize_sku
+				normalize = lambda SKU: normalized_by_sku[SKU] if SKU in normalized_by_sku else cached(SKU)
+
+	for SKU, quantity in new_orders_dict.items():
+		normalized = normalize(SKU)
 
-		if size == 'XXL':
-			size = '2XL'
+		# remaining SKUs cannot be normalized
+		if normalized is None:
+			cleaned_orders_dict[SKU] = [PickItem(SKU, None, None, quantity)]
+			unnormalizable += 1
+			continue
 
-		size_and_quant = size + '-' + str(quantity)
+		brand_and_style, size = normalized
 
-		# add/update SKU in dictionary
+		# add/update SKU in dictionary; SKUs spelled differently that normalize to the same size (e.g. "XXL" and "2XL")
+		# share one PickItem
 		if brand_and_style not in cleaned_orders_dict:
-			cleaned_orders_dict[brand_and_style] = [size_and_quant]
+			cleaned_orders_dict[brand_and_style] = [PickItem(brand_and_style, size, size_sort_key(size), quantity)]
 		else:
-			cleaned_orders_dict[brand_and_style].append(size_and_quant)
-					
+			items = cleaned_orders_dict[brand_and_style]
+			for i, item in enumerate(items):
+				if item.size == size:
+					items[i] = item._replace(quantity=item.quantity + quantity)
+					break
+			else:
+				items.append(PickItem(brand_and_style, size, size_sort_key(size), quantity))
+
+	instrument.count('distinct_skus', len(new_orders_dict))
+	instrument.count('skus_unnormalizable', unnormalizable)
 
-def create_pick_list(cleaned_orders_dict, ORDERS_FILE):
+
+def merge_store_orders(cleaned_orders_by_store, merged_orders_dict):
 	"""
-	Generates the pick list file
+	Combines several stores' cleaned orders into one aggregate with a per-store quantity breakdown for each size
 
-		cleaned_orders_dict:	entry key is a string of an item's "brand-style" and entry value a string of the item's 
-								"size-quantity" OR a list of the item's multiple "size-quantity" strings if multiple exist;
-								example entry: {"PREM-612": "XL-1"} OR {"PREM-612": ["XL-1", "MED-2", "LRG-2"]}
-		ORDERS_FILE: 			string of the name of the pick list file
+		cleaned_orders_by_store: 	dictionary of store label (e.g. "AMZ") to that store's cleaned_orders_dict
+		merged_orders_dict: 		dictionary to add the combined entries to; each entry value is a list of PickItems, one per
+									size, whose quantity is the total and whose stores holds each store's quantity
 	"""
 
-	# dict for customized sorting; need to sort by clothing size 
-	size_ordering = {
-		'XS': 0,
-		'SM': 1, 
-		'ME': 2,
-		'LA': 3,  # 'LARG'
-		'LR': 4,  # 'LRG'
-		'XL': 5, 
-		'2X': 6, 
-		'3X': 7, 
-		'4X': 8, 
-		'5X': 9, 
-		'6X': 10, 
-		'7X': 11, 
-		'8X': 12, 
-		'30': 13, 
-		'32': 14, 
-		'34': 15, 
-		'36': 16, 
-		'38': 17, 
-		'40': 18, 
-		'42': 19, 
-		'44': 20, 
-		'46': 21, 
-		'48': 22, 
-		'50': 23,
-		'52': 24,
-		'54': 25,
-	}
-
-	sorted_list_of_orders = []
-
-	for key, value in cleaned_orders_dict.items():
-		# if value is a list there are multiple sizes/quantities
-		if type(value) is list:
-			# sort by clothing size
-			value.sort(key=lambda x: size_ordering[x[:2]])
-			for i in range(len(value)):
-				size, quant = value[i].split('-')
-				# transform string of "size-quantity", and only include quantity in pick list if greater than one
-				# ex: 'MED-1' -> 'MED'
-				# ex: 'MED-2' -> 'MED (2)'
-				if int(quant) == 1:
-					value[i] = size
-				else:
-					value[i] = size + ' (' + quant + ')'
+	# key : str (item brand and style)
+	# val : dict of size -> [PickItem of the first store with that size, dict of store label -> quantity]
+	sizes_by_key = {}
+
+	for label, cleaned_orders_dict in cleaned_orders_by_store.items():
+		for key, items in cleaned_orders_dict.items():
+			sizes = sizes_by_key.setdefault(key, {})
+			for item in items:
+				if item.size not in sizes:
+					sizes[item.size] = [item, {}]
+				quantities = sizes[item.size][1]
+				quantities[label] = quantities.get(label, 0) + item.quantity
+
+	for key, sizes in sizes_by_key.items():
+		merged_orders_dict[key] = [
+			item._replace(quantity=sum(quantities.values()), stores=tuple(quantities.items()))
+			for item, quantities in sizes.values()
+		]
+
+
+# helper: pick list rows in pick route order, then every item without a location in alphanumeric order
+def _route_sorted(rows, location_index):
+	located = []
+	unlocated = []
+	for row in rows:
+		rank = location_index.route_rank(row.key)
+		if rank is None:
+			unlocated.append(row)
+		else:
+			located.append((rank, row.key, row._replace(aisle=location_index.location(row.key).aisle)))
+	located.sort(key=itemgetter(0, 1))
+	unlocated.sort(key=attrgetter('key'))
+	return [row for _rank, _key, row in located] + unlocated
 
-			# concat "->" for pick list
-			key = key + ' -> '
 
-			# concat sizes after the arrow; sizes are comma separated if applicable
-			for i in range(len(value)):
-				if i + 1 == len(value):
-					key = key + str(value[i])
-				else:
-					key = key + str(value[i]) + ', '
-			
-			key = key + '\n'
-
-			# formatting to read pick list more easily (left justification for some SKUs)
-			L, R = key.split(' -> ')
-			if L[:4] == 'BUCK':
-				key = '{}{}'.format(L.ljust(33), R)
-			elif L[:3] == 'ACE':
-				key = '{}{}'.format(L.ljust(23), R)
-			elif L[:3] == 'CAS':
-				key = '{}{}'.format(L.ljust(23), R)
-			elif L[:4] == 'STEX':
-				key = '{}{}'.format(L.ljust(14), R)
-			elif L[:4] == 'BARA':
-				key = '{}{}'.format(L.ljust(21), R)
-			elif L[:4] == 'VASS':
-				key = '{}{}'.format(L.ljust(23), R)
-
-		# if value is not a list there is just one size/quantity
+def partition_balanced(weights, parts):
+	"""
+	Splits a sequence into at most parts contiguous ranges whose largest total weight is as small as possible
+
+		weights: 	list of int weights (e.g. item quantities of pick list lines, in pick order)
+		parts: 		int number of ranges
+
+	Returns a list of (start, end) index ranges covering weights in order; an element is never split across ranges.
+	The smallest feasible largest total is found by binary search (a range is closed greedily once the next element would
+	exceed it), then ranges are filled up to it while leaving at least one element for each remaining range.
+	"""
+	if not weights:
+		return []
+	parts = max(1, min(parts, len(weights)))
+
+	def ranges_needed(limit):
+		needed = 1
+		total = 0
+		for weight in weights:
+			if total + weight > limit:
+				needed += 1
+				total = 0
+			total += weight
+		return needed
+
+	low, high = max(weights), sum(weights)
+	while low < high:
+		mid = (low + high) // 2
+		if ranges_needed(mid) <= parts:
+			high = mid
 		else:
-			# only include quantity in pick list if greater than one 
-			if int(value) > 1:
-				key = key + ' ... (' + value + ')' + '\n'
-			else:
-				key = key + '\n'
+			low = mid + 1
+
+	ranges = []
+	start = 0
+	total = 0
+	for i, weight in enumerate(weights):
+		remaining_ranges = parts - len(ranges) - 1
+		if i > start and (total + weight > low or len(weights) - i <= remaining_ranges):
+			ranges.append((start, i))
+			start = i
+			total = 0
+		total += weight
+	ranges.append((start, len(weights)))
+	return ranges
 
-		sorted_list_of_orders.append(key)
 
-	# sorting the pick list
-	sorted_list_of_orders.sort()
+def wave_file(ORDERS_FILE, wave):
+	# amazon_orders.txt -> amazon_orders.wave1.txt
+	root, extension = os.path.splitext(ORDERS_FILE)
+	return root + '.wave' + str(wave) + extension
+
+
+def pick_list_rows(cleaned_orders_dict, location_index=None):
+	"""
+	Returns the sorted list of render.Rows of a pick list (arguments as in create_pick_list)
+	"""
+
+	# one row per entry, sizes sorted by clothing size
+	rows = []
+	for key, items in cleaned_orders_dict.items():
+		if items[0].size is not None:
+			items.sort(key=attrgetter('size_rank'))
+		rows.append(render.Row(key, render.brand_of(key), None, sum(item.quantity for item in items), items))
+
+	# sorting the pick list: along the pick route, or alphanumerically
+	if location_index is None:
+		rows.sort(key=attrgetter('key'))
+	else:
+		rows = _route_sorted(rows, location_index)
+	return rows
+
+
+def create_pick_list(cleaned_orders_dict, ORDERS_FILE, location_index=None, pickers=1, formats=render.FORMATS):
+	"""
+	Generates the pick list files
+
+		cleaned_orders_dict:	entry key is a string of an item's "brand-style" and entry value a list of the item's PickItems,
+								one per size; example entry: {"PREM-612": [PickItem("PREM-612", "XL", (0, 4, 0, "XL"), 1), ...]}
+								(an item that cannot be normalized has a single PickItem with a size of None); PickItems with
+								per-store quantities (see merge_store_orders) are followed by their store breakdown
+		ORDERS_FILE: 			string of the name of the pick list file
+		location_index: 		optional locations.LocationIndex; items are then listed in pick route order by aisle, with
+								items that have no location at the end (otherwise the pick list is in alphanumeric order)
+		pickers: 				int number of pickers; above one the pick list is also split into that many waves of
+								contiguous lines with balanced item quantities (see partition_balanced), one file per picker
+		formats: 				iterable of formats the pick list is written in (see render.write_pick_list); waves are
+								written as text only
+
+	Returns the list of wave file names (empty for one picker)
+	"""
 
-	# add newline between SKUs of different brands to read pick list more easily
-	LEN = len(sorted_list_of_orders)
-	if LEN > 1:
-		brand = sorted_list_of_orders[0][:4]
-		for i in range(LEN):
-			if i + 1 == LEN:
-				break
-			_next = sorted_list_of_orders[i + 1][:4] 
-			if _next != brand:
-				brand = _next
-				sorted_list_of_orders[i] += '\n'
+	rows = pick_list_rows(cleaned_orders_dict, location_index)
 
 	# generate the pick list
-	with open(ORDERS_FILE, 'w', encoding='utf-8') as f:
-		for item in sorted_list_of_orders:
-			f.write(item)
\ No newline at end of file
+	render.write_pick_list(rows, ORDERS_FILE, formats)
+
+	if pickers <= 1:
+		return []
+
+	# one file per picker: contiguous lines (location ranges along the route), never splitting a line
+	wave_files = []
+	ranges = partition_balanced([row.quantity for row in rows], pickers)
+	for wave, (start, end) in enumerate(ranges, 1):
+		wave_rows = rows[start:end]
+		quantity = sum(row.quantity for row in wave_rows)
+		header = 'WAVE ' + str(wave) + ' OF ' + str(len(ranges)) + ' - ' + str(quantity) + ' ITEMS\n\n'
+		wave_files.extend(render.write_pick_list(wave_rows, wave_file(ORDERS_FILE, wave), ('txt',), header))
+	return wave_files
@@ -0,0 +1,90 @@
+import os
+import sqlite3
+import time
+
+
+# order IDs that have not been seen in an awaiting shipment batch for this many days have shipped and are pruned
+RETENTION_DAYS = 30
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+def _db_path(ID_FILE):
+	# amazon_ids.txt -> amazon_ids.sqlite3
+	return os.path.splitext(ID_FILE)[0] + '.sqlite3'
+
+
+class OrderIdStore:
+	"""
+	Indexed store of previously processed order IDs backed by a SQLite file
+
+	Membership checks are index lookups, so opening the store costs the same no matter how much history it holds.
+	If the store's old comma-separated ID file exists it is imported on first use and renamed to "<ID_FILE>.migrated".
+
+		ID_FILE: 	string of the name of the store's (old comma-separated) order ID file
+	"""
+
+	def __init__(self, ID_FILE):
+		self.path = _db_path(ID_FILE)
+		self._conn = sqlite3.connect(self.path)
+		self._conn.execute(
+			'CREATE TABLE IF NOT EXISTS order_ids ('
+			'order_id TEXT PRIMARY KEY, '
+			'first_seen INTEGER NOT NULL, '
+			'last_seen INTEGER NOT NULL'
+			') WITHOUT ROWID'
+		)
+		self._conn.execute('CREATE INDEX IF NOT EXISTS order_ids_last_seen ON order_ids (last_seen)')
+		self._conn.commit()
+
+		if os.path.isfile(ID_FILE):
+			self.migrate_csv(ID_FILE)
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+	def __contains__(self, order_id):
+		cur = self._conn.execute('SELECT 1 FROM order_ids WHERE order_id = ?', (order_id,))
+		return cur.fetchone() is not None
+
+	def __len__(self):
+		return self._conn.execute('SELECT COUNT(*) FROM order_ids').fetchone()[0]
+
+	def add_many(self, order_ids):
+		"""
+		Inserts order IDs in a single transaction; IDs already in the store have their last seen time refreshed
+
+			order_ids: 	iterable of order ID strings
+		"""
+		now = int(time.time())
+		with self._conn:
+			self._conn.executemany(
+				'INSERT INTO order_ids (order_id, first_seen, last_seen) VALUES (?, ?, ?) '
+				'ON CONFLICT (order_id) DO UPDATE SET last_seen = excluded.last_seen',
+				((order_id, now, now) for order_id in order_ids if order_id)
+			)
+
+	def prune(self, max_age_days=RETENTION_DAYS):
+		"""
+		Deletes order IDs not seen for more than max_age_days (shipped orders stop appearing in awaiting shipment batches)
+
+		Returns the number of order IDs deleted
+		"""
+		cutoff = int(time.time()) - max_age_days * SECONDS_PER_DAY
+		with self._conn:
+			cur = self._conn.execute('DELETE FROM order_ids WHERE last_seen < ?', (cutoff,))
+		return cur.rowcount
+
+	def migrate_csv(self, ID_FILE):
+		"""
+		Imports order IDs from an old comma-separated ID file, then renames the file so it is only imported once
+		"""
+		with open(ID_FILE, 'r') as f:
+			self.add_many(f.read().split(','))
+		os.replace(ID_FILE, ID_FILE + '.migrated')
+
+	def close(self):
+		self._conn.close()
@@ -0,0 +1,107 @@
+import os
+import json
+
+import logic
+
+
+# change this when OrderRecord changes, so state files written before are ignored (the next run fetches every order)
+STATE_VERSION = 2
+
+
+def _state_path(ID_FILE):
+	# amazon_ids.txt -> amazon_ids.orders.json
+	return os.path.splitext(ID_FILE)[0] + '.orders.json'
+
+
+class OrderState:
+	"""
+	Persisted per-store state of every outstanding order, so a rerun only fetches and parses orders that changed
+
+	Holds the OrderRecord of each order still awaiting shipment and, per ShipStation store ID, the latest "modifyDate" seen.
+	The first run (or any run after the state file is deleted) requests every outstanding order; later runs request
+	only orders modified since the latest "modifyDate" and drop orders that have since shipped, been cancelled, or held.
+
+		ID_FILE: 	string of the name of the store's order ID file (the state file is kept next to it)
+	"""
+
+	def __init__(self, ID_FILE):
+		self.path = _state_path(ID_FILE)
+		# key : str (ShipStation store ID)
+		# val : str (latest "modifyDate" seen)
+		self.watermarks = {}
+		# key : str (order number)
+		# val : OrderRecord
+		self.orders = {}
+
+		if os.path.isfile(self.path):
+			with open(self.path, 'r', encoding='utf-8') as f:
+				data = json.load(f)
+			if data.get('version') == STATE_VERSION:
+				self.watermarks = data['watermarks']
+				self.orders = {record[0]: logic.OrderRecord(*record) for record in data['orders']}
+
+	def order_queries(self, store):
+		"""
+		Returns the order queries for a store (see stores.STORES): its own queries when there is no state yet, otherwise
+		one query per store ID for orders of every status modified since that store ID's latest "modifyDate"
+		"""
+		if not self.is_complete(store):
+			return list(store['queries'])
+		return [(store_id, None, self.watermarks[str(store_id)]) for store_id in store['store_ids']]
+
+	def is_complete(self, store):
+		"""
+		Returns True when every store ID of the store has a watermark, so changed orders can be requested incrementally
+		"""
+		return all(str(store_id) in self.watermarks for store_id in store['store_ids'])
+
+	def update(self, orders, statuses, is_ebay, sku_cache=None, full=False):
+		"""
+		Applies fetched orders to the state; returns the number of orders summarized (parsed) this run
+
+			orders: 	iterable of JSON order dictionaries
+			statuses: 	set of order statuses that belong on the pick list (e.g. {"awaiting_shipment"})
+			is_ebay: 	boolean to flag if currently processing orders from eBay
+			sku_cache: 	optional SkuCache memoizing SKU cleaning
+			full: 		boolean, True if orders are every outstanding order (the state is replaced rather than updated)
+		"""
+		if full:
+			self.orders = {}
+
+		number_summarized = 0
+		for order in orders:
+			store_id = logic.store_id_of(order)
+			modify_date = order.get('modifyDate')
+			if modify_date and modify_date > self.watermarks.get(store_id, ''):
+				self.watermarks[store_id] = modify_date
+
+			order_num = logic.order_num_of(order, is_ebay)
+			# an order that has shipped, been cancelled, or put on hold no longer belongs on the pick list
+			if order['orderStatus'] not in statuses:
+				self.orders.pop(order_num, None)
+				continue
+
+			self.orders[order_num] = logic.summarize_order(order, is_ebay, sku_cache)
+			number_summarized += 1
+
+		return number_summarized
+
+	def records(self):
+		"""
+		Returns the OrderRecords of every outstanding order
+		"""
+		return list(self.orders.values())
+
+	def save(self):
+		"""
+		Writes the state file atomically (written to a temporary file, then renamed)
+		"""
+		data = {
+			'version': STATE_VERSION,
+			'watermarks': self.watermarks,
+			'orders': [list(record) for record in self.orders.values()],
+		}
+		tmp_path = self.path + '.tmp'
+		with open(tmp_path, 'w', encoding='utf-8') as f:
+			json.dump(data, f)
+		os.replace(tmp_path, self.path)
@@ -0,0 +1,150 @@
+import time
+
+# launch of the entry point, before anything else is imported
+_STARTED = time.perf_counter()
+
+import sys
+import argparse
+
+
+"""
+Single entry point for every pick list command.
+
+	python -m picklist run amazon ebay 			the pick list of each store, all stores fetched together in one process
+	python -m picklist run all 					one combined pick list of every store (as store_all.py)
+	python -m picklist run ebay --dry-run 		print ebay's pick list from its saved order state, without network calls
+	python -m picklist watch [options] 			watch mode (see watch.py)
+	python -m picklist standin [options] 		local ShipStation stand-in (see standin.py)
+	python -m picklist benchmark [options] 		stage benchmark (see benchmark.py)
+
+Modules are imported only by the command that needs them: help and usage errors return before config, the SKU map, or
+requests are imported, and a dry run never imports requests. The startup time, from launch until the command starts
+working, is printed and added to the run report as the "startup" stage.
+"""
+
+# store name that requests the combined pick list of every store
+ALL_STORES = 'all'
+
+# commands handed to another module's main with their remaining arguments
+DELEGATED = {
+	'watch': 'keep live pick lists current and serve them over HTTP',
+	'standin': 'local ShipStation stand-in serving synthetic or recorded orders',
+	'benchmark': 'benchmark the pick list stages on synthetic orders',
+}
+
+
+def report_startup():
+	"""
+	Prints the seconds from launch until now and adds them to the run report; returns the seconds
+	"""
+	import instrument
+
+	seconds = time.perf_counter() - _STARTED
+	instrument.add_time('startup', seconds)
+	print(f'Startup: {seconds * 1000:.0f} ms')
+	return seconds
+
+
+def dry_run(store_keys, combined):
+	"""
+	Prints the pick list each store would get from its saved order state, without network calls or writing any file
+
+		store_keys: 	list of keys of stores.STORES
+		combined: 		boolean, True to print one combined pick list of the stores instead (as run_all)
+	"""
+	import locations
+	import logic
+	import order_ids
+	import order_state
+	import render
+	import sku_cache
+	from stores import STORES
+
+	report_startup()
+
+	# read only: the cache is not saved
+	normalization_cache = sku_cache.SkuCache()
+	location_index = locations.load()
+
+	# key : str (store label)
+	# val : dict (the store's cleaned_orders_dict)
+	cleaned_orders_by_store = {}
+
+	for key in store_keys:
+		store = STORES[key]
+		records = order_state.OrderState(store['ids']).records()
+		new_orders_dict, number_of_new = {}, 0
+		# a store without saved orders has never run, so its order ID store is not created here
+		if records:
+			with order_ids.OrderIdStore(store['ids']) as order_id_store:
+				new_orders_dict, number_of_new = logic.new_orders_of(records, order_id_store)
+
+		cleaned_orders_dict = {}
+		logic.clean_and_normalize_order_data(new_orders_dict, cleaned_orders_dict, sku_cache=normalization_cache)
+		print(f'\n{store["name"]}: {number_of_new} new of {len(records)} saved orders (dry run, saved order state only)')
+		if combined:
+			cleaned_orders_by_store[store['label']] = cleaned_orders_dict
+		else:
+			print('\n' + render.render_text(logic.pick_list_rows(cleaned_orders_dict, location_index)))
+
+	if combined:
+		merged_orders_dict = {}
+		logic.merge_store_orders(cleaned_orders_by_store, merged_orders_dict)
+		print('\n' + render.render_text(logic.pick_list_rows(merged_orders_dict, location_index)))
+
+
+def run(parser, args):
+	combined = ALL_STORES in args.stores
+	if combined and len(args.stores) > 1:
+		parser.error(f'"{ALL_STORES}" cannot be combined with other stores')
+
+	from stores import STORES
+
+	unknown = [key for key in args.stores if key != ALL_STORES and key not in STORES]
+	if unknown:
+		parser.error(f'unknown store {", ".join(unknown)} (choose from {", ".join(STORES)}, {ALL_STORES})')
+	store_keys = list(STORES) if combined else list(dict.fromkeys(args.stores))
+
+	if args.dry_run:
+		dry_run(store_keys, combined)
+		return
+
+	import pipeline
+
+	report_startup()
+	if combined:
+		pipeline.run_all(incremental=not args.full, pickers=args.pickers)
+	else:
+		pipeline.run_stores(store_keys, incremental=not args.full, pickers=args.pickers)
+
+
+def main(argv=None):
+	argv = sys.argv[1:] if argv is None else list(argv)
+
+	# handed over before parsing, so every remaining argument (including --help) reaches the module
+	if argv and argv[0] in DELEGATED:
+		module = __import__(argv[0])
+		report_startup()
+		return module.main(argv[1:])
+
+	parser = argparse.ArgumentParser(prog='python -m picklist', description='Pick list commands.')
+	commands = parser.add_subparsers(dest='command', metavar='command', required=True)
+
+	run_parser = commands.add_parser('run', help='create the pick lists of one or more stores')
+	run_parser.add_argument('stores', nargs='+', help=f'store keys (e.g. amazon ebay), or "{ALL_STORES}" for one combined pick list')
+	run_parser.add_argument('--full', action='store_true', help='request every outstanding order instead of only the changed ones')
+	run_parser.add_argument('--pickers', type=int, default=1, help='split the pick list into one wave file per picker')
+	run_parser.add_argument('--dry-run', action='store_true', help='print the pick lists from the saved order state, without network calls')
+
+	# listed in the help only, see above
+	for name, description in DELEGATED.items():
+		commands.add_parser(name, help=description)
+
+	args = parser.parse_args(argv)
+	if args.pickers < 1:
+		parser.error('--pickers must be at least 1')
+	return run(parser, args)
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,365 @@
+import os
+import sys
+import datetime
+import itertools
+
+from config import WORLD_MAP, CONSOLIDATION_FILE, COMBINE_REPORT_FILE
+import consolidation
+import foreign_orders
+import instrument
+import logic
+import locations
+import order_ids
+import order_state
+import shipstation
+import sku_cache
+from stores import STORES
+
+
+# helper: ex: Monday May 29 09:29 AM
+def _now():
+	return datetime.datetime.now().strftime('%A %b %d') + ' ' + datetime.datetime.now().strftime("%I:%M %p")
+
+
+def refresh_or_exit(store_ids, store_name):
+	"""
+	Refreshes stores (concurrently) to pull all new orders; exits if a refresh fails
+	"""
+	try:
+		refreshed = shipstation.refresh_stores(store_ids)
+	except:
+		print('Error with store refresh POST request.')
+		sys.exit()
+
+	if all(refreshed):
+		print('\nImporting ' + store_name + ' - ' + _now() + '\n')
+	else:
+		print('Store refresh unsuccessful.')
+		sys.exit()
+
+
+def print_header(store_name, number_of_orders):
+	"""
+	Displays the store name and number of orders
+	"""
+	current_number_of_orders = str(number_of_orders)
+	header_ending = ' ORDERS |'
+	border = '+' + ('-' * (len(store_name) + len(current_number_of_orders) + len(header_ending) + 2)) + '+'
+	print(border)
+	print('| ' + store_name + ': ' + current_number_of_orders + header_ending)
+	print(border)
+
+
+def order_queries(store, state, incremental=True):
+	"""
+	Returns (list of order queries, boolean True if the queries request every outstanding order) for a store
+
+	Incremental runs only request orders changed since the last run once the store's order state is complete.
+	"""
+	if incremental and state.is_complete(store):
+		return state.order_queries(store), False
+	return list(store['queries']), True
+
+
+def collect_store(store, state, order_streams, full, normalization_cache=None, foreign=None):
+	"""
+	Applies a store's fetched orders to its order state, then parses and cleans every outstanding order
+
+		store: 					entry of stores.STORES
+		state: 					the store's OrderState
+		order_streams: 			iterables of JSON order dictionaries, one per query from order_queries
+		full: 					boolean, True if the streams hold every outstanding order
+		normalization_cache: 	optional SkuCache memoizing SKU cleaning and normalization
+		foreign: 				optional foreign_orders.ForeignOrders collecting the destinations of new foreign orders
+
+	Only orders in the streams are summarized from JSON; every outstanding order is then parsed from its OrderRecord,
+	so the log, order IDs, and customer reports cover all outstanding orders while the pick list only gets new ones.
+
+	Returns a dictionary of "number_of_orders", "number_fetched", "records", "cleaned_orders_dict",
+	"customer_name_more_than_one_dict", and "item_quantity_more_than_one_dict"
+	"""
+
+	# order information: the item Stock Keeping Unit (SKU) and its quantity
+	new_orders_dict = {}
+	# individual orders with an item quantity of more than one
+	item_quantity_more_than_one_dict = {}
+	# customers with multiple orders
+	customer_name_more_than_one_dict = {}
+	# cleaned SKUs
+	cleaned_orders_dict = {}
+
+	statuses = {order_status for _store_id, order_status in store['queries']}
+	# includes fetch_wait and decode: pages are fetched while orders are summarized
+	with instrument.timer('fetch_and_summarize'):
+		number_fetched = state.update(
+			itertools.chain.from_iterable(order_streams), statuses, store['is_ebay'], normalization_cache, full=full
+		)
+	records = state.records()
+	instrument.count('orders_fetched', number_fetched)
+
+	# order ID store: indexed lookups of previously processed order IDs (imports the old comma-separated ID file on first use)
+	order_id_store = order_ids.OrderIdStore(store['ids'])
+
+	# buffered writer for the log file and order ID store, counting foreign orders (creates new empty log for each pick list)
+	with instrument.timer('parse'):
+		with logic.LogWriter(store['log'], order_id_store, foreign) as log_writer:
+			number_of_orders = logic.parse_order_records(
+				records,
+				customer_name_more_than_one_dict,
+				order_id_store,
+				log_writer,
+				item_quantity_more_than_one_dict,
+				new_orders_dict
+				)
+
+	# drop order IDs that have since shipped
+	with instrument.timer('file_io'):
+		order_id_store.prune()
+		order_id_store.close()
+		state.save()
+
+	with instrument.timer('clean'):
+		logic.clean_and_normalize_order_data(new_orders_dict, cleaned_orders_dict, sku_cache=normalization_cache)
+
+	return {
+		'number_of_orders': number_of_orders,
+		'number_fetched': number_fetched,
+		'records': records,
+		'cleaned_orders_dict': cleaned_orders_dict,
+		'customer_name_more_than_one_dict': customer_name_more_than_one_dict,
+		'item_quantity_more_than_one_dict': item_quantity_more_than_one_dict,
+	}
+
+
+# helper: most recent order of a store for verification: eBay's orderKey of the highest serial order number, otherwise the
+# highest order number
+def _most_recent_order(store, records):
+	most_recent_order_number = float('-inf')
+	most_recent_order_string = '0'
+	for record in records:
+		order_num = record.order_number
+		# weird bug with ShipStation or Shopify: for one day order numbers started with "#" - trim "#" and cast order number to int
+		if order_num[0] == "#":
+			order_num = order_num[1:]
+		curr_order_num = int(order_num)
+		if curr_order_num > most_recent_order_number:
+			most_recent_order_number = curr_order_num
+			most_recent_order_string = record.order_num
+
+	if store['is_ebay']:
+		return most_recent_order_string
+	return str(most_recent_order_number)
+
+
+def write_footer(store, result):
+	"""
+	Appends the store's verification footer to its pick list: the order summary (Amazon) or the most recent order number
+	"""
+	with open(store['orders'], 'a', encoding='utf-8') as f:
+		f.write('\n------------------------------------------')
+
+		if store['footer'] == 'most_recent_order':
+			f.write('\n\n' + store['name'] + ':  ' + _most_recent_order(store, result['records']))
+			return
+
+		f.write('\n\n' + store['name'] + ': ' + str(result['number_of_orders']) + ' ORDERS\n')
+		f.write('\nCUSTOMERS WITH MORE THAN ONE ORDER:\n\n')
+
+		customer_with_multiple_orders = 0
+		for key, value in result['customer_name_more_than_one_dict'].items():
+			if value > 1:
+				customer_with_multiple_orders += 1
+				f.write('\t' + key + ' - ' + str(value) + '\n')
+		if customer_with_multiple_orders == 0:
+			f.write('\t' + u'\U0001f4a9' + '\n')
+
+		# add orders with more than one item quantity to pick list
+		f.write('\nORDERS WITH MORE THAN ONE ITEM QUANTITY:\n\n')
+		if result['item_quantity_more_than_one_dict']:
+			for key, value in result['item_quantity_more_than_one_dict'].items():
+				for i in value:
+					f.write('\t' + key + ' - ' + i + '\n')
+		else:
+			f.write('\t' + u'\U0001f4a9' + '\n')
+
+
+def update_consolidation(records_by_store):
+	"""
+	Replaces each store's outstanding orders in the cross-store consolidation index and rewrites the report of orders
+	that can ship together (run after the pick lists are written, so a failure here never costs a pick list)
+
+		records_by_store: 	dictionary of store label (e.g. "AMZ") to the store's OrderRecords
+	"""
+	with instrument.timer('consolidate'):
+		with consolidation.ConsolidationIndex(CONSOLIDATION_FILE) as index:
+			for label, records in records_by_store.items():
+				index.replace_store(label, records)
+			number_of_groups, cross_store = index.write_report(COMBINE_REPORT_FILE)
+
+	instrument.count('consolidation_groups', number_of_groups)
+	instrument.count('consolidation_cross_store_groups', cross_store)
+	print(f'\nCombine shipping: {number_of_groups} customers with more than one order ({cross_store} across stores) - {COMBINE_REPORT_FILE}\n')
+
+
+def write_foreign_orders(foreign):
+	"""
+	Adds the run's foreign order destinations to those of the earlier runs since refresh-all.py reset the world map
+	report, and rewrites the report grouped by country (run after the pick lists are written, so a failure here never
+	costs a pick list)
+	"""
+	with instrument.timer('file_io'):
+		report = foreign_orders.add_to_report(WORLD_MAP, foreign)
+	instrument.count('foreign_destinations', len(foreign))
+	print(f'\nForeign orders: {foreign.orders()} new, {report.orders()} to {len(report)} destinations since the last refresh - {WORLD_MAP}')
+
+
+def write_run_report(ORDERS_FILE, store_name, normalization_cache):
+	"""
+	Writes the run report (stage timers, counters, request latency, and SKU cache counters) next to the pick list
+	"""
+	return instrument.write_report(
+		ORDERS_FILE,
+		store=store_name,
+		requests=shipstation.latency_stats(),
+		sku_cache={'hits': normalization_cache.hits, 'misses': normalization_cache.misses},
+	)
+
+
+def run_stores(store_keys, incremental=True, pickers=1):
+	"""
+	Refreshes stores, fetches and parses their orders, and creates each store's pick list and one run report
+
+		store_keys: 	list of keys of stores in stores.STORES (e.g. ["amazon", "ebay"])
+		incremental: 	boolean, False to request and parse every outstanding order instead of only the changed ones
+		pickers: 		int number of pickers; above one each pick list is also split into one wave file per picker
+
+	Every store is refreshed and queried concurrently, then each store gets its own pick list. The run report covers the
+	whole run and is written next to the first store's pick list.
+	"""
+	stores = [STORES[store_key] for store_key in store_keys]
+	with instrument.profiled(stores[0]['orders']):
+		_run_stores(stores, incremental, pickers)
+
+	# automatically open pick list! :)
+	for store in stores:
+		os.system(f"open {store['orders']}")
+
+
+def _run_stores(stores, incremental, pickers):
+	# memoized SKU cleaning and normalization, kept on disk between runs
+	normalization_cache = sku_cache.SkuCache()
+	states = [order_state.OrderState(store['ids']) for store in stores]
+	store_names = ', '.join(store['name'] for store in stores)
+
+	with instrument.timer('refresh'):
+		refresh_or_exit([store_id for store in stores for store_id in store['store_ids']], store_names)
+
+	# first pages are requested concurrently, later pages are prefetched while the current page is parsed
+	queries_by_store = [order_queries(store, state, incremental) for store, state in zip(stores, states)]
+	order_streams = iter(shipstation.stream_orders_concurrently(
+		[query for queries, _full in queries_by_store for query in queries]
+	))
+
+	# foreign order destinations of the run, written once
+	foreign = foreign_orders.ForeignOrders()
+	results = []
+	for store, state, (queries, full) in zip(stores, states, queries_by_store):
+		streams = [next(order_streams) for _query in queries]
+		results.append(collect_store(store, state, streams, full, normalization_cache, foreign))
+	with instrument.timer('file_io'):
+		normalization_cache.save()
+
+	wave_files = []
+	for store, result in zip(stores, results):
+		print_header(store['name'], result['number_of_orders'])
+
+		with instrument.timer('render'):
+			wave_files.extend(logic.create_pick_list(result['cleaned_orders_dict'], store['orders'], locations.load(), pickers))
+			write_footer(store, result)
+
+	write_foreign_orders(foreign)
+	update_consolidation({store['label']: result['records'] for store, result in zip(stores, results)})
+
+	# request latency by endpoint, to see where fetch time goes, and SKU cache counters
+	print('\n' + shipstation.latency_summary() + '\n')
+	print(normalization_cache.stats() + '\n')
+	for wave_file in wave_files:
+		print('Wave: ' + wave_file)
+	print('Run report: ' + write_run_report(stores[0]['orders'], store_names, normalization_cache) + '\n')
+
+
+def run_all(incremental=True, pickers=1):
+	"""
+	Creates one combined pick list for every store with a per-store quantity breakdown next to each size
+
+	Every store is refreshed and queried concurrently, each store is parsed and cleaned as in run_stores (same log and
+	order ID files), then the stores are merged, sorted once, and written to ALL_ORDERS.
+	"""
+	from config import ALL_ORDERS
+
+	with instrument.profiled(ALL_ORDERS):
+		_run_all(ALL_ORDERS, incremental, pickers)
+
+	# automatically open pick list! :)
+	os.system(f"open {ALL_ORDERS}")
+
+
+def _run_all(ALL_ORDERS, incremental, pickers):
+	normalization_cache = sku_cache.SkuCache()
+	states = {key: order_state.OrderState(store['ids']) for key, store in STORES.items()}
+
+	with instrument.timer('refresh'):
+		refresh_or_exit([store_id for store in STORES.values() for store_id in store['store_ids']], 'ALL STORES')
+
+	# every store's queries: first pages are requested concurrently, later pages are prefetched while parsing
+	queries_by_store = {key: order_queries(store, states[key], incremental) for key, store in STORES.items()}
+	order_streams = iter(shipstation.stream_orders_concurrently(
+		[query for queries, _full in queries_by_store.values() for query in queries]
+	))
+
+	# key : str (store label)
+	# val : dict (the store's cleaned_orders_dict)
+	cleaned_orders_by_store = {}
+	# key : str (store name)
+	# val : int (number of orders)
+	number_of_orders_by_store = {}
+	# key : str (store label)
+	# val : list of the store's OrderRecords
+	records_by_store = {}
+	# foreign order destinations of every store, written once
+	foreign = foreign_orders.ForeignOrders()
+
+	for key, store in STORES.items():
+		queries, full = queries_by_store[key]
+		streams = [next(order_streams) for _query in queries]
+		result = collect_store(store, states[key], streams, full, normalization_cache, foreign)
+		cleaned_orders_by_store[store['label']] = result['cleaned_orders_dict']
+		records_by_store[store['label']] = result['records']
+		number_of_orders_by_store[store['name']] = result['number_of_orders']
+
+	with instrument.timer('file_io'):
+		normalization_cache.save()
+
+	for store_name, number_of_orders in number_of_orders_by_store.items():
+		print('| ' + store_name + ': ' + str(number_of_orders) + ' ORDERS')
+
+	# merge, sort once, create pick list
+	merged_orders_dict = {}
+	with instrument.timer('render'):
+		logic.merge_store_orders(cleaned_orders_by_store, merged_orders_dict)
+		wave_files = logic.create_pick_list(merged_orders_dict, ALL_ORDERS, locations.load(), pickers)
+
+		# add the number of orders of each store to pick list for verification
+		with open(ALL_ORDERS, 'a', encoding='utf-8') as f:
+			f.write('\n------------------------------------------\n')
+			for store_name, number_of_orders in number_of_orders_by_store.items():
+				f.write('\n' + store_name + ':  ' + str(number_of_orders) + ' ORDERS')
+
+	write_foreign_orders(foreign)
+	update_consolidation(records_by_store)
+
+	print('\n' + shipstation.latency_summary() + '\n')
+	print(normalization_cache.stats() + '\n')
+	for wave_file in wave_files:
+		print('Wave: ' + wave_file)
+	print('Run report: ' + write_run_report(ALL_ORDERS, 'ALL STORES', normalization_cache) + '\n')
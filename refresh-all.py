@@ -1,12 +1,7 @@
 import sys
-import time
 import datetime
-import requests
-from requests.auth import HTTPBasicAuth
 
 from config import (
-    API_KEY, 
-    SECRET_KEY,
     AMAZON_USA,
     AMAZON_CAN,
     PREM_SHIRTS, 
@@ -16,10 +11,10 @@ from config import (
     WORLD_MAP,
     SLEEP,
 )
+import foreign_orders
+import shipstation
 
 
-AUTH = HTTPBasicAuth(API_KEY, SECRET_KEY)
-
 """
 Refresh and import orders from the selling platforms.
 
@@ -32,40 +27,52 @@ Refresh and import orders from the selling platforms.
     nsotd_id (str):         New Shirt of the Day store identification number
     buckeroo_id (str):      Buckeroo store identification number
 """
-try:
-    ssapi = 'https://ssapi.shipstation.com/stores/refreshstore?storeId='
+# store names used in the progress output
+STORES = {
+    'AMAZON USA': AMAZON_USA,
+    'AMAZON CAN': AMAZON_CAN,
+    'EBAY': EBAY,
+    'PREMIER': PREM_SHIRTS,
+    'NEW SHIRT OF THE DAY': NSOTD,
+    'BUCKEROO': BUCKEROO,
+}
 
-    amazon_USA_resp = requests.post(ssapi + AMAZON_USA, auth=AUTH)
-    amazon_CAN_resp = requests.post(ssapi + AMAZON_CAN, auth=AUTH)
-    ebay_resp = requests.post(ssapi + EBAY, auth=AUTH)
-    prem_shirts_resp = requests.post(ssapi + PREM_SHIRTS, auth=AUTH)
-    nsotd_resp = requests.post(ssapi + NSOTD, auth=AUTH)
-    buck_resp = requests.post(ssapi + BUCKEROO, auth=AUTH)
+try:
+    # refresh status of each store before the refresh, used to tell when the new import has finished
+    statuses = shipstation.run_concurrently([(shipstation.get_refresh_status, (store_id,)) for store_id in STORES.values()])
+    statuses_before_refresh = dict(zip(STORES.values(), statuses))
+    # all six refresh requests are sent concurrently
+    refreshed = shipstation.refresh_stores(list(STORES.values()))
 except Exception as e:
     print('Error importing orders.\n')
     print(e)
     sys.exit()
 
 
-# suspend execution for two minutes to allow enough time for all stores to import orders
-if (amazon_USA_resp.json()['success'] == 'true' and
-    amazon_CAN_resp.json()['success'] == 'true' and
-    ebay_resp.json()['success'] == 'true' and
-    prem_shirts_resp.json()['success'] == 'true' and
-    nsotd_resp.json()['success'] == 'true' and
-    buck_resp.json()['success'] == 'true'):
+# print each store as it finishes importing
+def print_store_ready(store_name, seconds):
+    print(f'    {store_name} imported ({seconds:.0f}s)')
+
+
+# poll the stores until every store has imported its orders, waiting at most SLEEP seconds
+if all(refreshed):
     
     # ex: Monday May 29 at 09:29 AM
     print('\nRefreshing all stores - ' + datetime.datetime.now().strftime('%A %b %d') + ' ' + datetime.datetime.now().strftime("%I:%M %p") + '\n')
     
-    time.sleep(SLEEP)
+    not_imported = shipstation.wait_for_refresh(STORES, statuses_before_refresh, SLEEP, on_ready=print_store_ready)
     
-    print('\nStore refress successful, all orders imported.\n')
+    if not_imported:
+        print('\nStill importing after ' + str(SLEEP) + ' seconds: ' + ', '.join(not_imported) + '\n')
+    else:
+        print('\nStore refress successful, all orders imported.\n')
+
+    # request latency by endpoint, to see where the wait went
+    print(shipstation.latency_summary() + '\n')
 else:
     print('Store refresh unsuccessful.')
     sys.exit()
 
 
-# HTML file with google maps links, used to display location of foreign orders
-with open(WORLD_MAP, 'w', encoding='utf-8') as f:
-    f.write('\n')
\ No newline at end of file
+# HTML file with google maps links, used to display location of foreign orders: a new report for the day's store runs
+foreign_orders.reset(WORLD_MAP)
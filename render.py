@@ -0,0 +1,258 @@
+import io
+import os
+import csv
+import html
+import json
+import datetime
+from collections import namedtuple
+
+
+"""
+Rendering of a sorted pick list into its output files: the text pick list, CSV, JSON, and printable HTML.
+
+Every format is rendered from the same list of Rows, and each file is written with a single buffered write.
+"""
+
+# formats written by default; the text pick list keeps the pick list file name, the others swap its extension
+FORMATS = ('txt', 'csv', 'json', 'html')
+
+# one pick list entry
+# 	key: 		string of the item's brand and style (or the raw SKU of an item that cannot be normalized)
+# 	brand: 		string of the brand group the entry is aligned and separated with (see brand_of)
+# 	aisle: 		string of the entry's aisle along the pick route, or None (alphanumeric pick list, or no location)
+# 	quantity: 	int total item quantity of the entry
+# 	sizes: 		list of the entry's logic.PickItems sorted by size (a single PickItem with a size of None if the item
+# 				cannot be normalized)
+Row = namedtuple('Row', ['key', 'brand', 'aisle', 'quantity', 'sizes'])
+
+
+def brand_of(key):
+	# brands are told apart by their first four characters, "STEX2-NAVY" -> "STEX", "ACE-WOM-ES1000-BLU" -> "ACE-"
+	return key[:4]
+
+
+def output_file(ORDERS_FILE, fmt):
+	# amazon_orders.txt -> amazon_orders.csv
+	if fmt == 'txt':
+		return ORDERS_FILE
+	return os.path.splitext(ORDERS_FILE)[0] + '.' + fmt
+
+
+# helper: per-store quantities of an entry size, store quantity only included if greater than one
+# ex: "AMZ 2, EBAY"
+def _stores_text(item):
+	return ', '.join(label if quantity == 1 else label + ' ' + str(quantity) for label, quantity in item.stores)
+
+
+# helper: sizes of an entry, quantity only included if greater than one, each followed by its store breakdown
+# ex: "SML, MED (2), XL" or combined: "SML [PREM], MED (2) [AMZ, PREM], XL [EBAY]"
+def _sizes_text(row):
+	sizes = []
+	for item in row.sizes:
+		size = item.size if item.quantity == 1 else item.size + ' (' + str(item.quantity) + ')'
+		if item.stores is not None:
+			size += ' [' + _stores_text(item) + ']'
+		sizes.append(size)
+	return ', '.join(sizes)
+
+
+def column_widths(rows):
+	"""
+	Returns the dictionary of brand to the width its styles are left justified to (the longest style of the brand)
+	"""
+	widths = {}
+	for row in rows:
+		if row.sizes[0].size is not None and len(row.key) > widths.get(row.brand, 0):
+			widths[row.brand] = len(row.key)
+	return widths
+
+
+def _text_line(row, widths):
+	# item that cannot be normalized: only include quantity if greater than one
+	# ex: "SOME-SKU ... (3)"
+	if row.sizes[0].size is None:
+		item = row.sizes[0]
+		line = row.key if row.quantity == 1 else row.key + ' ... (' + str(row.quantity) + ')'
+		if item.stores is not None:
+			line += ' [' + _stores_text(item) + ']'
+		return line + '\n'
+
+	# styles of a brand are left justified to a common width, so sizes line up after the arrows
+	# ex: "PREM-612  -> SML, MED (2), XL"
+	return row.key.ljust(widths[row.brand]) + ' -> ' + _sizes_text(row) + '\n'
+
+
+def render_text(rows, widths=None):
+	"""
+	Returns the text pick list of rows
+
+	Entries with an aisle are listed under an "AISLE" header per aisle, followed by the entries without one under "NO
+	LOCATION"; without any aisles a newline separates the brands instead.
+
+		rows: 		list of Rows in pick list order
+		widths: 	optional dictionary of brand to style width (see column_widths), computed from rows if omitted
+	"""
+	if widths is None:
+		widths = column_widths(rows)
+
+	lines = []
+	section = brand = object()
+	for row in rows:
+		if row.aisle is not None:
+			if row.aisle != section:
+				if lines:
+					lines.append('\n')
+				lines.append('AISLE ' + row.aisle + '\n')
+				section = row.aisle
+		elif section is not None:
+			# first entry without a location
+			if lines:
+				lines.append('\nNO LOCATION\n')
+			section = None
+		elif row.brand != brand:
+			lines.append('\n')
+		brand = row.brand
+		lines.append(_text_line(row, widths))
+	return ''.join(lines)
+
+
+def render_csv(rows):
+	"""
+	Returns the pick list as CSV, one record per entry size: aisle, style, size, quantity, stores
+	"""
+	buffer = io.StringIO()
+	writer = csv.writer(buffer, lineterminator='\n')
+	writer.writerow(['aisle', 'style', 'size', 'quantity', 'stores'])
+	for row in rows:
+		for item in row.sizes:
+			stores = '' if item.stores is None else _stores_text(item)
+			writer.writerow([row.aisle or '', row.key, item.size or '', item.quantity, stores])
+	return buffer.getvalue()
+
+
+def render_json(rows, generated):
+	"""
+	Returns the pick list as a JSON document: {"generated": ..., "quantity": ..., "items": [...]}
+	"""
+	items = []
+	for row in rows:
+		items.append({
+			'style': row.key,
+			'aisle': row.aisle,
+			'quantity': row.quantity,
+			'sizes': [
+				{
+					'size': item.size,
+					'quantity': item.quantity,
+					'stores': None if item.stores is None else dict(item.stores),
+				}
+				for item in row.sizes
+			],
+		})
+	data = {
+		'generated': generated.isoformat(timespec='seconds'),
+		'quantity': sum(row.quantity for row in rows),
+		'items': items,
+	}
+	return json.dumps(data, indent=2) + '\n'
+
+
+HTML_STYLE = (
+	'body { font-family: sans-serif; font-size: 11pt; margin: 1.5em; }\n'
+	'table { border-collapse: collapse; width: 100%; }\n'
+	'th, td { border-bottom: 1px solid #ccc; padding: 3px 6px; text-align: left; vertical-align: top; }\n'
+	'th.section { background: #eee; border-top: 2px solid #000; }\n'
+	'td.quantity { text-align: right; white-space: nowrap; }\n'
+	'td.check { width: 1.5em; }\n'
+	'@media print { body { margin: 0; } tr { page-break-inside: avoid; } thead { display: table-header-group; } }\n'
+)
+
+
+def render_html(rows, title, generated):
+	"""
+	Returns the pick list as a printable HTML page: one table row per entry with a box to check off, under a header
+	per aisle (or per brand without aisles)
+	"""
+	escape = html.escape
+	parts = [
+		'<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n',
+		'<title>' + escape(title) + '</title>\n<style>\n' + HTML_STYLE + '</style>\n</head>\n<body>\n',
+		'<h1>' + escape(title) + '</h1>\n',
+		'<p>' + generated.strftime('%A %b %d %I:%M %p') + ' - ' + str(sum(row.quantity for row in rows)) + ' items</p>\n',
+		'<table>\n<thead><tr><th></th><th>Style</th><th>Sizes</th><th>Qty</th></tr></thead>\n<tbody>\n',
+	]
+
+	located = any(row.aisle is not None for row in rows)
+	section = object()
+	for row in rows:
+		if located:
+			heading = 'NO LOCATION' if row.aisle is None else 'AISLE ' + row.aisle
+		else:
+			heading = row.brand.rstrip('-')
+		if heading != section:
+			parts.append('<tr><th class="section" colspan="4">' + escape(heading) + '</th></tr>\n')
+			section = heading
+
+		item = row.sizes[0]
+		if item.size is not None:
+			sizes = _sizes_text(row)
+		elif item.stores is not None:
+			sizes = '[' + _stores_text(item) + ']'
+		else:
+			sizes = ''
+		parts.append(
+			'<tr><td class="check">&#9744;</td><td>' + escape(row.key) + '</td><td>' + escape(sizes)
+			+ '</td><td class="quantity">' + str(row.quantity) + '</td></tr>\n'
+		)
+
+	parts.append('</tbody>\n</table>\n</body>\n</html>\n')
+	return ''.join(parts)
+
+
+def render_pick_list(rows, fmt, title, generated, header=''):
+	"""
+	Returns the pick list of rows rendered in one format
+
+		rows: 		list of Rows in pick list order
+		fmt: 		string of the format ("txt", "csv", "json", "html")
+		title: 		string of the HTML page title (e.g. "amazon_orders")
+		generated: 	datetime the pick list was generated
+		header: 	string written before the text pick list (e.g. a wave header)
+	"""
+	if fmt == 'txt':
+		return header + render_text(rows)
+	if fmt == 'csv':
+		return render_csv(rows)
+	if fmt == 'json':
+		return render_json(rows, generated)
+	if fmt == 'html':
+		return render_html(rows, title, generated)
+	raise ValueError(f'unknown pick list format {fmt!r}')
+
+
+def write_rendered(ORDERS_FILE, rendered):
+	"""
+	Writes pick lists already rendered (dictionary of format to text, see render_pick_list) with a single write per file;
+	returns the list of file names written
+	"""
+	files = []
+	for fmt, text in rendered.items():
+		path = output_file(ORDERS_FILE, fmt)
+		with open(path, 'w', encoding='utf-8') as f:
+			f.write(text)
+		files.append(path)
+	return files
+
+
+def write_pick_list(rows, ORDERS_FILE, formats=FORMATS, header=''):
+	"""
+	Writes the pick list of rows in every format; returns the list of file names written
+
+		rows: 			list of Rows in pick list order
+		ORDERS_FILE: 	string of the name of the text pick list file (other formats swap its extension, see output_file)
+		formats: 		iterable of formats to write ("txt", "csv", "json", "html")
+		header: 		string written before the text pick list (e.g. a wave header)
+	"""
+	generated = datetime.datetime.now()
+	title = os.path.splitext(os.path.basename(ORDERS_FILE))[0]
+	return write_rendered(ORDERS_FILE, {fmt: render_pick_list(rows, fmt, title, generated, header) for fmt in formats})
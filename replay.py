@@ -0,0 +1,128 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+"""
+Recording and replay of ShipStation responses, for reproducing a run and measuring it offline.
+
+	SHIPSTATION_RECORD=<directory> 		record every ShipStation response of a run to the directory
+	SHIPSTATION_REPLAY=<directory> 		answer every ShipStation request from a recording instead of the network
+	SHIPSTATION_REPLAY_LATENCY=<scale> 	replay each response after its recorded latency times scale (default 0, no wait)
+
+One file per request (method and path, query included) holds every response in the order they were received, so
+repeated requests (e.g. refresh status polls, retried 429 responses) replay in the same order; the last response repeats.
+A replayed run makes the same requests as the recorded run as long as the order state files (order_state) match too.
+"""
+
+RECORD_DIR = os.environ.get('SHIPSTATION_RECORD')
+REPLAY_DIR = os.environ.get('SHIPSTATION_REPLAY')
+REPLAY_LATENCY_SCALE = float(os.environ.get('SHIPSTATION_REPLAY_LATENCY', '0'))
+
+# response headers kept in a recording
+RECORDED_HEADERS = ('Content-Type', 'X-Rate-Limit-Limit', 'X-Rate-Limit-Remaining', 'X-Rate-Limit-Reset', 'Retry-After')
+
+
+def recording_name(method, path):
+	"""
+	Returns the file name of a request's recording, e.g. "GET_orders_1f0c....json"
+	"""
+	endpoint = path.split('?')[0].strip('/').replace('/', '_')
+	digest = hashlib.sha1((method + ' ' + path).encode('utf-8')).hexdigest()[:16]
+	return f'{method}_{endpoint}_{digest}.json'
+
+
+class Recorder:
+	"""
+	Writes every response of a run to a directory (see recording_name); a request's file is rewritten as responses arrive
+
+		directory: 	string of the name of the recording directory (created if missing)
+	"""
+
+	def __init__(self, directory):
+		self.directory = directory
+		os.makedirs(directory, exist_ok=True)
+		self._lock = threading.Lock()
+		# key : tuple (method, path)
+		# val : list of recorded response dictionaries
+		self._responses = {}
+
+	def record(self, method, path, resp, seconds):
+		entry = {
+			'status': resp.status_code,
+			'headers': {name: resp.headers[name] for name in RECORDED_HEADERS if name in resp.headers},
+			'body': resp.text,
+			'seconds': round(seconds, 4),
+		}
+		with self._lock:
+			responses = self._responses.setdefault((method, path), [])
+			responses.append(entry)
+			data = {'method': method, 'path': path, 'responses': responses}
+			file_path = os.path.join(self.directory, recording_name(method, path))
+			tmp_path = file_path + '.tmp'
+			with open(tmp_path, 'w', encoding='utf-8') as f:
+				json.dump(data, f)
+			os.replace(tmp_path, file_path)
+
+
+class Replayer:
+	"""
+	Answers requests from a recording directory written by Recorder
+
+		directory: 		string of the name of the recording directory
+		latency_scale: 	number multiplying each response's recorded latency before it is returned (0 returns at once)
+	"""
+
+	def __init__(self, directory, latency_scale=0):
+		self.directory = directory
+		self.latency_scale = latency_scale
+		self._lock = threading.Lock()
+		# key : tuple (method, path)
+		# val : list of recorded response dictionaries
+		self._responses = {}
+		# key : tuple (method, path)
+		# val : int (number of times the request was answered)
+		self._calls = {}
+
+	def entry(self, method, path):
+		"""
+		Returns the next recorded response dictionary ("status", "headers", "body", "seconds") of a request
+
+		Raises KeyError if the request was never recorded.
+		"""
+		key = (method, path)
+		with self._lock:
+			if key not in self._responses:
+				file_path = os.path.join(self.directory, recording_name(method, path))
+				if not os.path.isfile(file_path):
+					raise KeyError(f'no recorded response for {method} {path}')
+				with open(file_path, 'r', encoding='utf-8') as f:
+					self._responses[key] = json.load(f)['responses']
+			responses = self._responses[key]
+			calls = self._calls.get(key, 0)
+			self._calls[key] = calls + 1
+		return responses[min(calls, len(responses) - 1)]
+
+	def response(self, method, path, url):
+		"""
+		Returns the next recorded response of a request as a requests.Response (after its scaled recorded latency)
+		"""
+		entry = self.entry(method, path)
+		if self.latency_scale:
+			time.sleep(entry['seconds'] * self.latency_scale)
+
+		resp = requests.Response()
+		resp.status_code = entry['status']
+		resp.headers = CaseInsensitiveDict(entry['headers'])
+		resp._content = entry['body'].encode('utf-8')
+		# the body is already read, so streamed reads (iter_content) return it in slices
+		resp._content_consumed = True
+		resp.encoding = 'utf-8'
+		resp.url = url
+		resp.request = requests.Request(method, url).prepare()
+		return resp
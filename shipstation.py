@@ -0,0 +1,466 @@
+import os
+import time
+import codecs
+import random
+from urllib.parse import quote, urlsplit
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+
+from config import API_KEY, SECRET_KEY
+import replay
+import instrument
+import json_stream
+
+
+AUTH = HTTPBasicAuth(API_KEY, SECRET_KEY)
+
+# SHIPSTATION_API points every request at another server, e.g. the local stand-in (standin.py): http://127.0.0.1:8765
+SSAPI = os.environ.get('SHIPSTATION_API', 'https://ssapi.shipstation.com')
+
+# maximum number of ShipStation requests in flight at once
+MAX_CONCURRENT_REQUESTS = 6
+
+# orders per page, ShipStation's maximum
+PAGE_SIZE = 500
+
+# (connect, read) timeouts in seconds for every request
+TIMEOUT = (10, 60)
+
+# retries for rate limited (429) and server error responses: attempts after the first, and base delay (seconds) doubled per retry
+MAX_RETRIES = 4
+RETRY_BACKOFF = 1
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# decode order pages incrementally as the response body arrives (see iter_orders), reading this many bytes at a time
+STREAM_DECODE = True
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# readiness polling after a store refresh: first delay, backoff multiplier, and longest delay between polls (seconds)
+POLL_INITIAL_DELAY = 2
+POLL_BACKOFF = 2
+POLL_MAX_DELAY = 20
+
+# shared thread pool for first page requests and next page prefetching while streaming orders
+_executor = None
+
+# shared HTTP session: one connection pool (keep-alive) for every ShipStation request in the run
+_session = None
+_session_lock = threading.Lock()
+
+# latency of every request attempt: list of (method, path, status code or exception name, seconds)
+latencies = []
+_latencies_lock = threading.Lock()
+
+# record every response to disk (SHIPSTATION_RECORD) or answer every request from a recording (SHIPSTATION_REPLAY), see replay
+_recorder = replay.Recorder(replay.RECORD_DIR) if replay.RECORD_DIR else None
+_replayer = replay.Replayer(replay.REPLAY_DIR, replay.REPLAY_LATENCY_SCALE) if replay.REPLAY_DIR else None
+
+
+def _get_executor():
+	global _executor
+	if _executor is None:
+		_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS)
+	return _executor
+
+
+def get_session():
+	"""
+	Returns the shared requests Session, created on first use with a connection pool sized for MAX_CONCURRENT_REQUESTS
+	"""
+	global _session
+	with _session_lock:
+		if _session is None:
+			session = requests.Session()
+			session.auth = AUTH
+			session.headers.update({'Accept': 'application/json', 'Accept-Encoding': 'gzip, deflate'})
+			adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONCURRENT_REQUESTS)
+			session.mount('https://', adapter)
+			session.mount('http://', adapter)
+			_session = session
+	return _session
+
+
+# helper: seconds to wait before retrying; honors ShipStation's rate limit reset header, otherwise exponential backoff with full jitter
+def _retry_delay(resp, attempt):
+	delay = random.uniform(0, RETRY_BACKOFF * 2**attempt)
+	if resp is not None and resp.status_code == 429:
+		reset = resp.headers.get('X-Rate-Limit-Reset') or resp.headers.get('Retry-After')
+		if reset is not None and reset.isdigit():
+			delay += int(reset)
+	return delay
+
+
+def _record_latency(method, path, outcome, seconds):
+	with _latencies_lock:
+		latencies.append((method, path, outcome, seconds))
+
+
+def request(method, path, stream=False):
+	"""
+	Sends a request to the ShipStation API through the shared session and returns the response
+
+		method: 	string of the HTTP method ("GET" or "POST")
+		path: 		string of the API path and query (e.g. "/stores/refreshstore?storeId=123")
+		stream: 	boolean to return once the headers arrive and read the body as it is consumed (close the response after)
+
+	Connection errors, timeouts, and RETRY_STATUSES responses are retried up to MAX_RETRIES times.
+	Raises requests.HTTPError for a failed response once retries are exhausted.
+	In replay mode responses come from the recording; in record mode every response is also written to disk.
+	"""
+	session = get_session()
+	for attempt in range(MAX_RETRIES + 1):
+		start = time.perf_counter()
+		try:
+			if _replayer is not None:
+				resp = _replayer.response(method, path, SSAPI + path)
+			else:
+				resp = session.request(method, SSAPI + path, timeout=TIMEOUT, stream=stream)
+		except (requests.ConnectionError, requests.Timeout) as e:
+			_record_latency(method, path, type(e).__name__, time.perf_counter() - start)
+			if attempt == MAX_RETRIES:
+				raise
+			resp = None
+		else:
+			seconds = time.perf_counter() - start
+			_record_latency(method, path, resp.status_code, seconds)
+			if _recorder is not None:
+				_recorder.record(method, path, resp, seconds)
+			if resp.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+				resp.raise_for_status()
+				return resp
+			# release the connection of a streamed response that is retried
+			resp.close()
+		delay = _retry_delay(resp, attempt)
+		# replayed retries wait on the same scale as replayed responses
+		if _replayer is not None:
+			delay *= _replayer.latency_scale
+		time.sleep(delay)
+
+
+def reset_latencies():
+	"""
+	Clears the recorded request latencies (a long-running process calls it at the start of each unit of work)
+	"""
+	with _latencies_lock:
+		latencies.clear()
+
+
+def latency_stats():
+	"""
+	Returns request latency grouped by endpoint: {"GET /orders": {"requests", "seconds", "mean", "max"}, ...}
+	"""
+	with _latencies_lock:
+		records = list(latencies)
+
+	endpoints = {}
+	for method, path, outcome, seconds in records:
+		endpoints.setdefault(method + ' ' + path.split('?')[0], []).append(seconds)
+
+	return {
+		endpoint: {'requests': len(times), 'seconds': sum(times), 'mean': sum(times) / len(times), 'max': max(times)}
+		for endpoint, times in sorted(endpoints.items())
+	}
+
+
+def latency_summary():
+	"""
+	Returns a printable summary of request latency grouped by endpoint: count, total, mean, and slowest seconds
+	"""
+	lines = []
+	for endpoint, stats in latency_stats().items():
+		lines.append(f"{endpoint:<32} {stats['requests']:>4} requests  {stats['seconds']:7.2f}s total  {stats['mean']:6.2f}s mean  {stats['max']:6.2f}s max")
+	return '\n'.join(lines)
+
+
+def refresh_store(store_id):
+	"""
+	Refreshes a store to pull all new orders; returns True if ShipStation reports success
+	"""
+	resp = request('POST', f'/stores/refreshstore?storeId={store_id}')
+	return resp.json()['success'] == 'true'
+
+
+def get_refresh_status(store_id):
+	"""
+	Returns the JSON refresh status of a store: "refreshStatus" ("Updating" or "Idle"), "lastRefreshAttempt", and "refreshDate"
+	"""
+	resp = request('GET', f'/stores/getrefreshstatus?storeId={store_id}')
+	return resp.json()
+
+
+# helper: refresh status for polling, None if the request fails (the store is polled again)
+def _poll_refresh_status(store_id):
+	try:
+		return get_refresh_status(store_id)
+	except (requests.RequestException, ValueError):
+		return None
+
+
+# helper: refresh date of a status, None if unknown
+def _refresh_date(status):
+	return None if status is None else status.get('refreshDate')
+
+
+# helper: a store has finished importing once it is idle and either its last successful refresh is newer than the one
+# before our refresh, or it was seen updating since (lastRefreshAttempt changes as soon as a refresh starts, so it is not used)
+def _refresh_finished(status, status_before_refresh, seen_updating):
+	if status is None or status.get('refreshStatus') != 'Idle':
+		return False
+	if seen_updating:
+		return True
+	refresh_date = _refresh_date(status)
+	refresh_date_before = _refresh_date(status_before_refresh)
+	return refresh_date is not None and (refresh_date_before is None or refresh_date > refresh_date_before)
+
+
+def wait_for_refresh(stores, statuses_before_refresh, timeout, on_ready=None):
+	"""
+	Polls every store's refresh status with exponential backoff until all stores have finished importing orders
+
+		stores: 					dictionary of store name to store ID
+		statuses_before_refresh: 	dictionary of store ID to its refresh status from before the refresh (see get_refresh_status)
+		timeout: 					number of seconds to wait before giving up
+		on_ready: 					function called with (store name, seconds waited) as each store finishes
+
+	The first poll waits POLL_INITIAL_DELAY, so a refresh that has not started updating yet is not taken for a finished one.
+
+	Returns the list of store names that had not finished by the deadline (empty if every store finished)
+	"""
+	start = time.monotonic()
+	deadline = start + timeout
+	pending = dict(stores)
+	# store IDs reported as "Updating" since the refresh
+	seen_updating = set()
+	delay = POLL_INITIAL_DELAY
+
+	while pending:
+		remaining = deadline - time.monotonic()
+		if remaining <= 0:
+			break
+		time.sleep(min(delay, remaining))
+		delay = min(delay * POLL_BACKOFF, POLL_MAX_DELAY)
+
+		statuses = run_concurrently([(_poll_refresh_status, (store_id,)) for store_id in pending.values()])
+		for (name, store_id), status in zip(list(pending.items()), statuses):
+			if status is not None and status.get('refreshStatus') == 'Updating':
+				seen_updating.add(store_id)
+			elif _refresh_finished(status, statuses_before_refresh.get(store_id), store_id in seen_updating):
+				del pending[name]
+				if on_ready is not None:
+					on_ready(name, time.monotonic() - start)
+
+	return list(pending)
+
+
+# helper: API path of one page of a store's orders
+def _orders_path(store_id, order_status, page, modify_date_start):
+	path = f'/orders?storeId={store_id}&sortBy=OrderDate&sortDir=DESC&page={page}&pageSize={PAGE_SIZE}'
+	if order_status is not None:
+		path += f'&orderStatus={order_status}'
+	if modify_date_start is not None:
+		path += f'&modifyDateStart={quote(modify_date_start)}'
+	return path
+
+
+def get_orders_page(store_id, order_status, page=1, modify_date_start=None):
+	"""
+	Returns the JSON response for one page of a store's orders with the given status (e.g. "awaiting_shipment")
+
+	An order_status of None requests orders of every status. With modify_date_start (a ShipStation "modifyDate" string)
+	only orders modified at or after that time are returned.
+	The response dictionary holds the page's "orders" list along with ShipStation's "total", "page", and "pages" fields.
+	"""
+	resp = request('GET', _orders_path(store_id, order_status, page, modify_date_start))
+	with instrument.timer('decode'):
+		return resp.json()
+
+
+def open_orders_page(store_id, order_status, page=1, modify_date_start=None):
+	"""
+	Requests one page of a store's orders (see get_orders_page) and returns the response as soon as its headers arrive;
+	the body is read by iter_page_orders
+	"""
+	return request('GET', _orders_path(store_id, order_status, page, modify_date_start), stream=True)
+
+
+def iter_page_orders(resp, fields=None):
+	"""
+	Yields the JSON order dictionaries of a streamed page response one at a time while the body is still arriving
+
+		resp: 		response from open_orders_page (closed once the page is read)
+		fields: 	optional dictionary filled with the page's other fields ("total", "page", "pages") once it is read
+	"""
+	parser = json_stream.ArrayParser('orders')
+	decoder = codecs.getincrementaldecoder('utf-8')()
+	chunks = resp.iter_content(STREAM_CHUNK_SIZE)
+	try:
+		while True:
+			with instrument.timer('fetch_wait'):
+				chunk = next(chunks, None)
+			with instrument.timer('decode'):
+				if chunk is None:
+					orders = parser.feed(decoder.decode(b'', final=True), final=True)
+				else:
+					orders = parser.feed(decoder.decode(chunk))
+			yield from orders
+			if chunk is None:
+				break
+	finally:
+		resp.close()
+
+	if fields is not None:
+		fields.update(parser.fields)
+
+
+def iter_order_pages(store_id, order_status, prefetch=True, first_page=None, modify_date_start=None):
+	"""
+	Yields a store's orders one page (list of JSON order dictionaries) at a time, following ShipStation's "page"/"pages" fields
+
+		store_id: 			string of the store identification number
+		order_status: 		string of the order status to request (e.g. "awaiting_shipment"), None for every status
+		prefetch: 			boolean to request the next page in the background while the current page is being parsed
+		first_page: 		Future of the first page's response if it was already requested
+		modify_date_start: 	optional ShipStation "modifyDate" string, to only request orders modified since then
+
+	Only the current page (and the prefetched next page) is held in memory.
+	"""
+	executor = _get_executor()
+	page = 1
+	# time spent waiting for pages that were not there yet (the rest of the fetch overlaps with parsing)
+	with instrument.timer('fetch_wait'):
+		data = first_page.result() if first_page is not None else get_orders_page(store_id, order_status, page, modify_date_start)
+
+	while True:
+		more_pages = page < (data.get('pages') or 1)
+		if more_pages and prefetch:
+			next_page = executor.submit(get_orders_page, store_id, order_status, page + 1, modify_date_start)
+
+		instrument.count('pages_fetched')
+		yield data['orders']
+
+		if not more_pages:
+			return
+		page += 1
+		with instrument.timer('fetch_wait'):
+			data = next_page.result() if prefetch else get_orders_page(store_id, order_status, page, modify_date_start)
+
+
+# helper: close the response of a prefetched page that turned out not to exist
+def _close_unused_page(future):
+	if future.exception() is None:
+		future.result().close()
+
+
+def iter_orders(store_id, order_status, prefetch=True, first_page=None, modify_date_start=None):
+	"""
+	Yields a store's JSON order dictionaries one at a time across every page (arguments as in iter_order_pages)
+
+	With STREAM_DECODE each page is decoded while it arrives (first_page is then a Future of open_orders_page), so
+	memory stays flat regardless of page size. ShipStation sends "pages" after the orders, so the second page is
+	prefetched once the first page turns out to be full, and later pages as soon as the previous one starts.
+	"""
+	if not STREAM_DECODE:
+		for orders in iter_order_pages(store_id, order_status, prefetch, first_page, modify_date_start):
+			yield from orders
+		return
+
+	executor = _get_executor()
+	page = 1
+	pages = None
+	with instrument.timer('fetch_wait'):
+		resp = first_page.result() if first_page is not None else open_orders_page(store_id, order_status, page, modify_date_start)
+
+	while True:
+		next_page = None
+		if prefetch and pages is not None and page < pages:
+			next_page = executor.submit(open_orders_page, store_id, order_status, page + 1, modify_date_start)
+
+		fields = {}
+		number_of_orders = 0
+		for order in iter_page_orders(resp, fields):
+			number_of_orders += 1
+			# a full first page most likely has another page after it
+			if prefetch and pages is None and number_of_orders == PAGE_SIZE:
+				next_page = executor.submit(open_orders_page, store_id, order_status, page + 1, modify_date_start)
+			yield order
+
+		instrument.count('pages_fetched')
+		pages = fields.get('pages') or 1
+		if page >= pages:
+			if next_page is not None:
+				next_page.add_done_callback(_close_unused_page)
+			return
+
+		page += 1
+		with instrument.timer('fetch_wait'):
+			resp = next_page.result() if next_page is not None else open_orders_page(store_id, order_status, page, modify_date_start)
+
+
+def resource_path(resource_url):
+	"""
+	Returns the API path and query of a webhook's resource URL, e.g. "/orders?storeID=123&importBatch=..."
+
+	Only the path and query are kept: the resource is always requested from SSAPI with the API credentials.
+	"""
+	url = urlsplit(resource_url)
+	return url.path + ('?' + url.query if url.query else '')
+
+
+def iter_resource_orders(resource_url):
+	"""
+	Yields the JSON order dictionaries of a webhook's resource URL (e.g. an ORDER_NOTIFY import batch), page by page
+	"""
+	path = resource_path(resource_url)
+	separator = '&' if '?' in path else '?'
+	page = 1
+	while True:
+		resp = request('GET', path if page == 1 else f'{path}{separator}page={page}')
+		with instrument.timer('decode'):
+			data = resp.json()
+		yield from data['orders']
+		if page >= data.get('pages', 1):
+			break
+		page += 1
+
+
+def run_concurrently(calls, max_workers=MAX_CONCURRENT_REQUESTS):
+	"""
+	Runs blocking request functions on a thread pool and returns their results in the same order as calls
+
+		calls: 			list of (function, tuple of arguments)
+		max_workers: 	int maximum number of requests in flight at once
+
+	An exception raised by any call is re-raised here once every call has finished.
+	"""
+	with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(calls)))) as executor:
+		futures = [executor.submit(func, *args) for func, args in calls]
+		return [future.result() for future in futures]
+
+
+def refresh_stores(store_ids, max_workers=MAX_CONCURRENT_REQUESTS):
+	"""
+	Refreshes every store concurrently; returns a list of success booleans in the same order as store_ids
+	"""
+	return run_concurrently([(refresh_store, (store_id,)) for store_id in store_ids], max_workers)
+
+
+def stream_orders_concurrently(queries, prefetch=True):
+	"""
+	Requests the first page of every query concurrently and returns one order generator per query
+
+		queries: 	list of (store ID, order status) or (store ID, order status, modify date start) tuples
+
+	Later pages are requested as each generator is consumed (see iter_orders).
+	"""
+	executor = _get_executor()
+	queries = [(tuple(query) + (None,))[:3] for query in queries]
+	open_page = open_orders_page if STREAM_DECODE else get_orders_page
+	first_pages = [executor.submit(open_page, store_id, order_status, 1, modify_date_start) for store_id, order_status, modify_date_start in queries]
+	return [
+		iter_orders(store_id, order_status, prefetch, first_page, modify_date_start)
+		for (store_id, order_status, modify_date_start), first_page in zip(queries, first_pages)
+	]
@@ -0,0 +1,126 @@
+import os
+import json
+import hashlib
+from collections import OrderedDict
+
+from sku_map import MAP
+import logic
+
+
+# cache file kept next to the scripts; it is rebuilt automatically whenever the SKU map or normalization rules change
+SKU_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sku_cache.json')
+
+# most entries kept per table (least recently used entries are dropped first)
+MAX_ENTRIES = 20000
+
+
+def rules_fingerprint():
+	"""
+	Returns a hash of everything a cached result depends on: the SKU map, the normalization rules, and SKU_RULES_VERSION
+	"""
+	content = repr((
+		logic.SKU_RULES_VERSION,
+		sorted(MAP.items()),
+		logic.NORMALIZATION_RULES,
+		logic.SIZE_ALIASES,
+	))
+	return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+class SkuCache:
+	"""
+	Bounded in-memory and on-disk memoization of SKU cleaning and normalization
+
+	Raw SKU and description -> cleaned SKU (logic.clean_sku) and cleaned SKU -> (brand_and_style, size) (logic.normalize_sku).
+	The file is ignored when its fingerprint does not match the current SKU map and rules.
+
+		path: 			string of the name of the cache file (None keeps the cache in memory only)
+		max_entries: 	int most entries kept per table
+	"""
+
+	def __init__(self, path=SKU_CACHE_FILE, max_entries=MAX_ENTRIES):
+		self.path = path
+		self.max_entries = max_entries
+		self.fingerprint = rules_fingerprint()
+		self.hits = 0
+		self.misses = 0
+		self._cleaned = OrderedDict()
+		self._normalized = OrderedDict()
+		self._load()
+
+	def _load(self):
+		if self.path is None or not os.path.isfile(self.path):
+			return
+		try:
+			with open(self.path, 'r', encoding='utf-8') as f:
+				data = json.load(f)
+		except (OSError, ValueError):
+			return
+		if data.get('fingerprint') != self.fingerprint:
+			return
+
+		for sku, description, cleaned in data.get('cleaned', []):
+			self._cleaned[(sku, description)] = cleaned
+		for SKU, normalized in data.get('normalized', []):
+			self._normalized[SKU] = tuple(normalized) if normalized is not None else None
+
+	# helper: look up key in table, computing and storing it on a miss; hits become the most recently used entry
+	def _get(self, table, key, compute, *args):
+		try:
+			value = table[key]
+		except KeyError:
+			self.misses += 1
+			value = table[key] = compute(*args)
+			if len(table) > self.max_entries:
+				table.popitem(last=False)
+		else:
+			self.hits += 1
+			table.move_to_end(key)
+		return value
+
+	def clean_sku(self, sku, description):
+		return self._get(self._cleaned, (sku, description), logic.clean_sku, sku, description)
+
+	def normalize_sku(self, SKU):
+		return self._get(self._normalized, SKU, logic.normalize_sku, SKU)
+
+	def missing_normalized(self, SKUs):
+		"""
+		Returns the list of SKUs whose normalization is not cached
+		"""
+		return [SKU for SKU in SKUs if SKU not in self._normalized]
+
+	def add_normalized(self, normalized_by_sku):
+		"""
+		Caches normalizations computed elsewhere (e.g. on a process pool); each one counts as a miss
+		"""
+		for SKU, normalized in normalized_by_sku.items():
+			self.misses += 1
+			self._normalized[SKU] = normalized
+			self._normalized.move_to_end(SKU)
+		while len(self._normalized) > self.max_entries:
+			self._normalized.popitem(last=False)
+
+	def stats(self):
+		"""
+		Returns a printable line of hit and miss counters
+		"""
+		lookups = self.hits + self.misses
+		rate = 100 * self.hits / lookups if lookups else 0
+		return f'SKU cache: {self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate)'
+
+	def save(self):
+		"""
+		Writes the cache file atomically (written to a temporary file, then renamed)
+		"""
+		if self.path is None:
+			return
+		data = {
+			'fingerprint': self.fingerprint,
+			'cleaned': [[sku, description, cleaned] for (sku, description), cleaned in self._cleaned.items()],
+			'normalized': [[SKU, normalized] for SKU, normalized in self._normalized.items()],
+		}
+		tmp_path = self.path + '.tmp'
+		with open(tmp_path, 'w', encoding='utf-8') as f:
+			json.dump(data, f)
+		os.replace(tmp_path, self.path)
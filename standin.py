@@ -0,0 +1,401 @@
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import datetime
+import threading
+import urllib.request
+import uuid
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+import replay
+
+
+"""
+Local stand-in for the ShipStation API, to run every store script end to end offline.
+
+	python standin.py --orders 2000 				serve synthetic orders (2000 per store ID)
+	python standin.py --recording recordings/monday 	serve a recording written in record mode (see replay)
+
+then point the scripts at it:
+
+	SHIPSTATION_API=http://127.0.0.1:8765 python store_amazon.py
+
+Serves POST /stores/refreshstore, GET /stores/getrefreshstatus, and GET /orders with ShipStation's pagination
+("total", "page", "pages") and rate limit headers (X-Rate-Limit-Limit, -Remaining, -Reset; 429 once the window's
+requests are used up). Every response can be delayed by a fixed latency for deterministic timings. A synthetic store
+refresh reports "Updating" for --refresh-seconds before it finishes and moves the store's refreshDate.
+
+With --webhook, synthetic orders also arrive over time: every --import-every seconds each store ID requested so far gets
+an import batch of new orders, announced with an ORDER_NOTIFY webhook whose resource URL lists only that batch:
+
+	python standin.py --orders 2000 --webhook http://127.0.0.1:8766/webhook
+"""
+
+HOST = '127.0.0.1'
+PORT = 8765
+
+# ShipStation allows 40 requests per 60 second window
+RATE_LIMIT = 40
+RATE_WINDOW = 60
+
+# sizes of synthetic items: shirts, jeans (waist and inseam), and shorts (waist)
+SHIRT_SIZES = ['SML', 'MED', 'LRG', 'XL', 'XXL', '2XL', '3XL', '4XL', '5XL']
+JEANS_SIZES = ['30X30', '32X30', '32X32', '34X32', '36X32', '38X32', '40X34']
+SHORTS_SIZES = ['30', '32', '34', '36', '38', '40']
+
+# (SKU template, sizes) of every normalization rule's layout ({} is the size), see logic.NORMALIZATION_RULES
+SYNTHETIC_SKUS = [
+	('PREM-646-{}', SHIRT_SIZES), ('PREM-631NEW-{}', SHIRT_SIZES), ('PREM-210P-{}', SHIRT_SIZES),
+	('PREM-TS201-LS-{}', SHIRT_SIZES), ('PREM-618-RED-{}', SHIRT_SIZES), ('PREM-SS-101-{}', SHIRT_SIZES),
+	('STEX-BLK-{}', SHIRT_SIZES), ('STX-CHAR-{}', SHIRT_SIZES),
+	('WICK-1234-{}', SHORTS_SIZES), ('WEAR-220-{}', SHORTS_SIZES),
+	('AMDS-RED-01-{}', SHIRT_SIZES), ('VESE-BLU-07-{}', SHIRT_SIZES),
+	('CAS-PURP-01-{}', SHIRT_SIZES), ('CAS-NAV-3065-{}', SHIRT_SIZES), ('CAS-SS-45-WHT-{}', SHIRT_SIZES),
+	('RODEO-524-{}', SHIRT_SIZES), ('RODEO-BEIG-533-{}', SHIRT_SIZES), ('RODEO-BRWN-PS400461N-{}', SHIRT_SIZES),
+	('RODEO-RED-438BT-{}', SHIRT_SIZES), ('ACE-WHT-ES5110-{}', SHIRT_SIZES), ('RODEO-SS2115-438BT-{}', SHIRT_SIZES),
+	('ACE-HFK700-10-NVYBLU-{}', SHIRT_SIZES), ('ACE-WOM-BLU-ES5110-{}', SHIRT_SIZES),
+	('BUCK-WS6-BEGE/BRWN-{}', SHIRT_SIZES), ('BUCK-WS100-01-BLACK/BLUE-{}', SHIRT_SIZES),
+	('BUCK-WS200-SS-17-BURGBLK-{}', SHIRT_SIZES),
+	('VICT-DK211-{}', SHIRT_SIZES), ('ENVY-41030-{}', SHIRT_SIZES), ('VICT-BLACK-1082-{}', JEANS_SIZES),
+	('ENVY-LACEUP-WHT-41028-{}', SHIRT_SIZES), ('VIC-100-DENIM-JACKET-DARK-INDIGO-{}', SHIRT_SIZES),
+	('SOCI-BLU-5521-{}', JEANS_SIZES),
+	('VASS-LEOP-VS135-{}', SHIRT_SIZES), ('BENZ-BLK-BZ22-{}', SHIRT_SIZES), ('GAV-NAVY-G100-{}', SHIRT_SIZES),
+	('STEELO-RED-ST7-{}', SHIRT_SIZES), ('BARA-WHT/BLK-B339-{}', SHIRT_SIZES),
+	('CAN-HERO-100-{}', SHIRT_SIZES), ('CANLADY-FLAG-12-{}', SHIRT_SIZES),
+]
+
+# SKUs cleaned before normalizing (see logic.clean_sku): (SKU, description); None and "wi_" SKUs use the description
+SYNTHETIC_MESSY_SKUS = [
+	(None, 'PREM-646-LRG'), ('', 'PREM-646-XL'), ('wi_8f3a2c', 'RODEO-524-MED'),
+	('PREM-612-XL-SL', 'PREM-612-XL'), ('STEX-RED-MED-D', 'STEX-RED-MED'), ('WICK-1234-34-2', 'WICK-1234-34'),
+	('UNKNOWN-SKU', 'Gift card'),
+]
+
+SYNTHETIC_CITIES = [('Dallas', 'US')] * 18 + [('Toronto', 'CA'), ('London', 'GB')]
+SYNTHETIC_NAMES = ['Alex Smith', 'Sam Jones', 'Jordan Lee', 'Taylor Brown', 'Casey Davis', 'Riley Garcia', 'Morgan Chen']
+# customer name spellings and street numbers: the same customer and address show up in several orders and stores
+SYNTHETIC_SPELLINGS = [str.upper, str.lower, lambda name: name.replace(' ', '  '), lambda name: name]
+SYNTHETIC_STREETS = 40
+
+
+def synthetic_orders(
+	store_id, count, order_status='awaiting_shipment', seed=0, start=datetime.datetime(2024, 1, 1), first=0
+):
+	"""
+	Returns a list of count synthetic ShipStation JSON order dictionaries for a store, the same for the same arguments
+
+	Items cover every normalization rule (SYNTHETIC_SKUS) plus a few SKUs that need cleaning (SYNTHETIC_MESSY_SKUS).
+
+		store_id: 		string of the store identification number
+		count: 			int number of orders
+		order_status: 	string of every order's "orderStatus"
+		seed: 			int seed of the random generator
+		start: 			datetime of the first order's "orderDate" and "modifyDate" (orders are a minute apart)
+		first: 			int index of the first order, to continue a store's orders (e.g. a later import batch)
+	"""
+	rng = random.Random(f'{seed}-{store_id}-{order_status}' + (f'-{first}' if first else ''))
+	orders = []
+	for n in range(first, first + count):
+		number = int(store_id) * 1000000 + n + 1
+		date = (start + datetime.timedelta(minutes=n)).strftime('%Y-%m-%dT%H:%M:%S.0000000')
+		city, country = rng.choice(SYNTHETIC_CITIES)
+		name = rng.choice(SYNTHETIC_NAMES)
+		street = str(rng.randrange(SYNTHETIC_STREETS)) + ' Main St'
+		items = []
+		for _item in range(rng.choice((1, 1, 1, 2, 3))):
+			if rng.random() < 0.02:
+				sku, description = rng.choice(SYNTHETIC_MESSY_SKUS)
+			else:
+				template, sizes = rng.choice(SYNTHETIC_SKUS)
+				sku = description = template.format(rng.choice(sizes))
+			items.append({'sku': sku, 'name': description, 'quantity': rng.choice((1, 1, 1, 1, 2))})
+		orders.append({
+			'orderId': number,
+			'orderNumber': str(number),
+			'orderKey': f'{store_id}-{number}',
+			'orderDate': date,
+			'modifyDate': date,
+			'orderStatus': order_status,
+			# List Orders has no top-level store ID, only this one
+			'advancedOptions': {'storeId': int(store_id)},
+			'billTo': {'name': rng.choice(SYNTHETIC_SPELLINGS)(name)},
+			'shipTo': {'name': name, 'street1': street, 'city': city, 'postalCode': '75201', 'country': country},
+			'items': items,
+		})
+	return orders
+
+
+class SyntheticShipStation:
+	"""
+	Synthetic ShipStation data: count orders awaiting shipment for every store ID that is requested
+
+		count: 				int number of orders per store ID
+		seed: 				int seed of the random generator
+		refresh_seconds: 	number of seconds a store refresh reports "Updating" before it finishes
+	"""
+
+	def __init__(self, count, seed=0, refresh_seconds=0):
+		self.count = count
+		self.seed = seed
+		self.refresh_seconds = refresh_seconds
+		self._lock = threading.Lock()
+		# key : str (store ID)
+		# val : list of JSON order dictionaries
+		self._orders = {}
+		# key : str (store ID)
+		# val : tuple (time the latest refresh started, monotonic time it finishes, refresh date before it)
+		self._refreshed = {}
+		# key : str (import batch ID)
+		# val : set of order numbers imported in the batch
+		self._batches = {}
+
+	def orders(self, store_id):
+		with self._lock:
+			if store_id not in self._orders:
+				self._orders[store_id] = synthetic_orders(store_id, self.count, seed=self.seed)
+			return self._orders[store_id]
+
+	def store_ids(self):
+		"""
+		Returns the list of store IDs requested so far
+		"""
+		with self._lock:
+			return list(self._orders)
+
+	def import_batch(self, store_id, count):
+		"""
+		Adds count new orders awaiting shipment to a store, as a marketplace import would; returns the ORDER_NOTIFY
+		resource URL path of the batch (e.g. "/orders?storeID=123&importBatch=...")
+		"""
+		orders = self.orders(store_id)
+		with self._lock:
+			batch = synthetic_orders(store_id, count, seed=self.seed, first=len(orders))
+			# replaced rather than extended, so a page being served keeps its list
+			self._orders[store_id] = orders + batch
+			batch_id = uuid.uuid4().hex
+			self._batches[batch_id] = {order['orderNumber'] for order in batch}
+		return f'/orders?storeID={store_id}&importBatch={batch_id}'
+
+	# helper: (refresh status, last refresh attempt, refresh date) of a store, called with the lock held; the refresh date
+	# only moves once a refresh has finished, as ShipStation's does
+	def _refresh_status(self, store_id):
+		if store_id not in self._refreshed:
+			return 'Idle', None, None
+		started, finishes, refresh_date_before = self._refreshed[store_id]
+		last_attempt = started.strftime('%Y-%m-%dT%H:%M:%S.%f')
+		if time.monotonic() < finishes:
+			return 'Updating', last_attempt, refresh_date_before
+		finished = started + datetime.timedelta(seconds=self.refresh_seconds)
+		return 'Idle', last_attempt, finished.strftime('%Y-%m-%dT%H:%M:%S.%f')
+
+	def respond(self, method, path):
+		"""
+		Returns (status code, JSON body) of a request
+		"""
+		url = urlsplit(path)
+		query = {key: values[0] for key, values in parse_qs(url.query).items()}
+		# webhook resource URLs spell it "storeID"
+		store_id = query.get('storeId', query.get('storeID', '0'))
+
+		if method == 'POST' and url.path == '/stores/refreshstore':
+			with self._lock:
+				self._refreshed[store_id] = (
+					datetime.datetime.now(), time.monotonic() + self.refresh_seconds, self._refresh_status(store_id)[2]
+				)
+			return 200, {'success': 'true', 'message': 'A store refresh has been initiated.'}
+
+		if method == 'GET' and url.path == '/stores/getrefreshstatus':
+			with self._lock:
+				refresh_status, last_attempt, refresh_date = self._refresh_status(store_id)
+			return 200, {
+				'storeId': int(store_id), 'refreshStatus': refresh_status, 'lastRefreshAttempt': last_attempt,
+				'refreshDate': refresh_date,
+			}
+
+		if method == 'GET' and url.path == '/orders':
+			orders = self.orders(store_id)
+			if 'orderStatus' in query:
+				orders = [order for order in orders if order['orderStatus'] == query['orderStatus']]
+			if 'importBatch' in query:
+				with self._lock:
+					batch = self._batches.get(query['importBatch'], set())
+				orders = [order for order in orders if order['orderNumber'] in batch]
+			if 'modifyDateStart' in query:
+				orders = [order for order in orders if order['modifyDate'] >= query['modifyDateStart']]
+			# newest first, as requested with sortBy=OrderDate&sortDir=DESC
+			orders = orders[::-1]
+			page_size = int(query.get('pageSize', 100))
+			page = int(query.get('page', 1))
+			return 200, {
+				'orders': orders[(page - 1) * page_size:page * page_size],
+				'total': len(orders),
+				'page': page,
+				'pages': max(1, math.ceil(len(orders) / page_size)),
+			}
+
+		return 404, {'Message': 'No HTTP resource was found that matches the request URI.'}
+
+
+class RateLimiter:
+	"""
+	Fixed window request counter with ShipStation's rate limit headers
+
+		limit: 		int requests allowed per window (0 for no limit)
+		window: 	int seconds per window
+	"""
+
+	def __init__(self, limit=RATE_LIMIT, window=RATE_WINDOW):
+		self.limit = limit
+		self.window = window
+		self._lock = threading.Lock()
+		self._window_start = time.monotonic()
+		self._used = 0
+
+	def take(self):
+		"""
+		Returns (boolean True if the request is allowed, dictionary of rate limit headers)
+		"""
+		if not self.limit:
+			return True, {}
+		with self._lock:
+			now = time.monotonic()
+			if now - self._window_start >= self.window:
+				self._window_start = now
+				self._used = 0
+			allowed = self._used < self.limit
+			if allowed:
+				self._used += 1
+			reset = max(0, math.ceil(self._window_start + self.window - now))
+			headers = {
+				'X-Rate-Limit-Limit': str(self.limit),
+				'X-Rate-Limit-Remaining': str(self.limit - self._used),
+				'X-Rate-Limit-Reset': str(reset),
+			}
+		return allowed, headers
+
+
+def make_handler(source, rate_limiter, latency=0):
+	"""
+	Returns the request handler class of a stand-in server
+
+		source: 		SyntheticShipStation or replay.Replayer answering requests
+		rate_limiter: 	RateLimiter of the server
+		latency: 		number of seconds every response is delayed
+	"""
+
+	class StandInHandler(BaseHTTPRequestHandler):
+		protocol_version = 'HTTP/1.1'
+
+		def _respond(self, method):
+			if latency:
+				time.sleep(latency)
+			allowed, headers = rate_limiter.take()
+
+			if not allowed:
+				status, body = 429, json.dumps({'Message': 'Too Many Requests'})
+			elif isinstance(source, replay.Replayer):
+				try:
+					entry = source.entry(method, self.path)
+				except KeyError as e:
+					status, body = 404, json.dumps({'Message': str(e)})
+				else:
+					status, body = entry['status'], entry['body']
+					headers = dict(headers, **{k: v for k, v in entry['headers'].items() if k == 'Content-Type'})
+			else:
+				status, body = source.respond(method, self.path)
+				body = json.dumps(body)
+
+			data = body.encode('utf-8')
+			self.send_response(status)
+			self.send_header('Content-Type', headers.pop('Content-Type', 'application/json; charset=utf-8'))
+			self.send_header('Content-Length', str(len(data)))
+			for name, value in headers.items():
+				self.send_header(name, value)
+			self.end_headers()
+			self.wfile.write(data)
+
+		def do_GET(self):
+			self._respond('GET')
+
+		def do_POST(self):
+			# drain any request body so the connection can be kept alive
+			self.rfile.read(int(self.headers.get('Content-Length') or 0))
+			self._respond('POST')
+
+		def log_message(self, format, *args):
+			pass
+
+	return StandInHandler
+
+
+def post_webhook(webhook_url, resource_url, resource_type='ORDER_NOTIFY'):
+	"""
+	Posts a ShipStation webhook payload ({"resource_url": ..., "resource_type": ...}) to a receiver, e.g. watch.py's
+	/webhook; returns the response status code
+	"""
+	data = json.dumps({'resource_url': resource_url, 'resource_type': resource_type}).encode('utf-8')
+	req = urllib.request.Request(webhook_url, data=data, headers={'Content-Type': 'application/json'}, method='POST')
+	with urllib.request.urlopen(req, timeout=10) as resp:
+		return resp.status
+
+
+def serve(source, host=HOST, port=PORT, rate_limit=RATE_LIMIT, latency=0):
+	"""
+	Returns a started stand-in server (serving on a background thread); call shutdown() to stop it
+
+	A port of 0 picks a free port; the chosen one is server.server_address[1].
+	"""
+	server = ThreadingHTTPServer((host, port), make_handler(source, RateLimiter(rate_limit), latency))
+	server.daemon_threads = True
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	return server
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='Local ShipStation stand-in serving synthetic or recorded orders.')
+	group = parser.add_mutually_exclusive_group(required=True)
+	group.add_argument('--orders', type=int, help='serve this many synthetic orders per store ID')
+	group.add_argument('--recording', help='serve responses from a recording directory (see replay)')
+	parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic orders')
+	parser.add_argument('--host', default=HOST)
+	parser.add_argument('--port', type=int, default=PORT)
+	parser.add_argument('--rate-limit', type=int, default=RATE_LIMIT, help='requests per minute, 0 for no limit')
+	parser.add_argument('--latency', type=float, default=0, help='seconds every response is delayed')
+	parser.add_argument('--refresh-seconds', type=float, default=3, help='seconds a synthetic store refresh reports "Updating"')
+	parser.add_argument('--webhook', help='URL to post an ORDER_NOTIFY webhook to for every synthetic import batch')
+	parser.add_argument('--import-every', type=float, default=60, help='seconds between synthetic import batches')
+	parser.add_argument('--import-size', type=int, default=5, help='new orders per store ID in each import batch')
+	args = parser.parse_args(argv)
+
+	if args.recording:
+		source = replay.Replayer(args.recording)
+	else:
+		source = SyntheticShipStation(args.orders, args.seed, args.refresh_seconds)
+
+	server = serve(source, args.host, args.port, args.rate_limit, args.latency)
+	base_url = f'http://{args.host}:{server.server_address[1]}'
+	print(f'ShipStation stand-in on {base_url} - Ctrl+C to stop')
+	try:
+		while not args.webhook or args.recording:
+			time.sleep(3600)
+
+		# new orders for every store ID requested so far, announced to the webhook receiver
+		while True:
+			time.sleep(args.import_every)
+			for store_id in source.store_ids():
+				resource_url = base_url + source.import_batch(store_id, args.import_size)
+				try:
+					status = post_webhook(args.webhook, resource_url)
+				except OSError as e:
+					status = e
+				print(f'Imported {args.import_size} orders for store {store_id}, webhook: {status}')
+	except KeyboardInterrupt:
+		server.shutdown()
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,15 @@
+import sys
+
+import picklist
+
+
+"""
+Combined pick list for every store: one warehouse pass instead of one per store.
+
+Every store is refreshed and queried concurrently, each store's orders are parsed and normalized as in the store
+scripts (same log and order ID files), then the stores are merged, sorted once, and written to a single pick list
+with a per-store quantity breakdown next to each size.
+"""
+
+if __name__ == '__main__':
+    sys.exit(picklist.main(['run', 'all']))
@@ -0,0 +1,100 @@
+from config import (
+    AMAZON_USA,
+    AMAZON_CAN,
+    EBAY,
+    PREM_SHIRTS,
+    NSOTD,
+    BUCKEROO,
+    AMAZON_ORDERS,
+    AMAZON_LOG,
+    AMAZON_IDS,
+    EBAY_ORDERS,
+    EBAY_LOG,
+    EBAY_IDS,
+    PREM_ORDERS,
+    PREM_LOG,
+    PREM_IDS,
+    NSOTD_ORDERS,
+    NSOTD_LOG,
+    NSOTD_IDS,
+    BUCK_ORDERS,
+    BUCK_LOG,
+    BUCK_IDS,
+)
+
+
+"""
+Selling platforms and the ShipStation queries, files, and labels of each.
+
+    name (str):         store name printed in headers and pick lists
+    label (str):        short store name used in the per-store breakdown of a combined pick list
+    store_ids (list):   ShipStation store identification numbers to refresh
+    queries (list):     (store identification number, order status) of every order query
+    is_ebay (bool):     flag for eBay's "orderKey" order numbers
+    orders (str):       name of the store's pick list file
+    log (str):          name of the store's log file
+    ids (str):          name of the store's order ID file
+    footer (str):       verification footer of the store's pick list: "order_summary" or "most_recent_order"
+"""
+STORES = {
+    'amazon': {
+        'name': 'AMAZON',
+        'label': 'AMZ',
+        'store_ids': [AMAZON_USA, AMAZON_CAN],
+        'queries': [
+            (AMAZON_USA, 'awaiting_shipment'),
+            (AMAZON_USA, 'pending_fulfillment'),
+            (AMAZON_CAN, 'awaiting_shipment'),
+            (AMAZON_CAN, 'pending_fulfillment'),
+        ],
+        'is_ebay': False,
+        'orders': AMAZON_ORDERS,
+        'log': AMAZON_LOG,
+        'ids': AMAZON_IDS,
+        'footer': 'order_summary',
+    },
+    'ebay': {
+        'name': 'EBAY',
+        'label': 'EBAY',
+        'store_ids': [EBAY],
+        'queries': [(EBAY, 'awaiting_shipment')],
+        'is_ebay': True,
+        'orders': EBAY_ORDERS,
+        'log': EBAY_LOG,
+        'ids': EBAY_IDS,
+        'footer': 'most_recent_order',
+    },
+    'premier': {
+        'name': 'PREMIER',
+        'label': 'PREM',
+        'store_ids': [PREM_SHIRTS],
+        'queries': [(PREM_SHIRTS, 'awaiting_shipment')],
+        'is_ebay': False,
+        'orders': PREM_ORDERS,
+        'log': PREM_LOG,
+        'ids': PREM_IDS,
+        'footer': 'most_recent_order',
+    },
+    'nsotd': {
+        'name': 'NEW SHIRT OF THE DAY',
+        'label': 'NSOTD',
+        'store_ids': [NSOTD],
+        'queries': [(NSOTD, 'awaiting_shipment')],
+        'is_ebay': False,
+        'orders': NSOTD_ORDERS,
+        'log': NSOTD_LOG,
+        'ids': NSOTD_IDS,
+        'footer': 'most_recent_order',
+    },
+    'buckeroo': {
+        'name': 'BUCKEROO',
+        'label': 'BUCK',
+        'store_ids': [BUCKEROO],
+        'queries': [(BUCKEROO, 'awaiting_shipment')],
+        'is_ebay': False,
+        'orders': BUCK_ORDERS,
+        'log': BUCK_LOG,
+        'ids': BUCK_IDS,
+        'footer': 'most_recent_order',
+    },
+}
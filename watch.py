@@ -0,0 +1,441 @@
+import os
+import sys
+import hmac
+import json
+import time
+import queue
+import argparse
+import datetime
+import itertools
+import threading
+from collections import namedtuple
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+import instrument
+import locations
+import logic
+import order_ids
+import order_state
+import pipeline
+import render
+import shipstation
+import sku_cache
+from stores import STORES
+
+
+"""
+Watch mode: a long-running process that keeps every store's outstanding orders, SKU cache, and live pick list in memory.
+
+	python watch.py [--stores amazon ebay] [--interval 120] [--port 8766]
+
+Each poll asks ShipStation to import new marketplace orders (without waiting; the import is picked up by the next poll,
+and a failed refresh is only reported), requests only the orders modified since the last poll, and regenerates a
+store's live pick list only when the new orders on it changed. The live pick list is what the store script would print
+right now: the outstanding orders not yet on a printed pick list. Watch mode never marks orders as processed and writes
+no logs; it writes its pick list next to the store's as "<orders>.live.txt" (and .csv, .json, .html), so a printed pick
+list is never overwritten.
+
+The live pick lists are served over HTTP (GET):
+
+	/ 						JSON summary of every watched store
+	/<store> 				the store's live pick list as text, e.g. /amazon
+	/<store>.<format> 		the store's live pick list as csv, json, or html, e.g. /amazon.html
+
+ShipStation webhooks are received too: POST /webhook with an ORDER_NOTIFY payload ({"resource_url": ..., "resource_type":
+"ORDER_NOTIFY"}) queues its resource, and only the orders it references are requested and applied between polls. With
+PICKLIST_WEBHOOK_TOKEN set, the webhook URL must carry it: /webhook?token=<token>. standin.py --webhook posts sample
+payloads for new synthetic orders.
+"""
+
+HOST = '127.0.0.1'
+PORT = 8766
+
+# seconds between the start of two polls
+POLL_SECONDS = 120
+
+# shared secret a webhook URL must carry as its "token" query parameter (no check if unset)
+WEBHOOK_TOKEN = os.environ.get('PICKLIST_WEBHOOK_TOKEN')
+
+# webhook resource types whose resource lists orders
+WEBHOOK_RESOURCE_TYPES = {'ORDER_NOTIFY'}
+
+# largest webhook request body read, in bytes
+MAX_WEBHOOK_BYTES = 64 * 1024
+
+CONTENT_TYPES = {
+	'txt': 'text/plain; charset=utf-8',
+	'csv': 'text/csv; charset=utf-8',
+	'json': 'application/json; charset=utf-8',
+	'html': 'text/html; charset=utf-8',
+}
+
+# a store's current live pick list, replaced as a whole so the HTTP thread never sees a half updated one
+# 	generated: 			datetime the pick list was generated
+# 	number_of_orders: 	int number of outstanding orders
+# 	number_of_new: 		int number of outstanding orders not yet on a printed pick list
+# 	quantity: 			int number of items on the pick list
+# 	rendered: 			dictionary of format to the rendered pick list (see render.render_pick_list)
+LivePickList = namedtuple('LivePickList', ['generated', 'number_of_orders', 'number_of_new', 'quantity', 'rendered'])
+
+
+def live_file(ORDERS_FILE):
+	# amazon_orders.txt -> amazon_orders.live.txt
+	root, extension = os.path.splitext(ORDERS_FILE)
+	return root + '.live' + extension
+
+
+class StoreWatch:
+	"""
+	A watched store: its order state and order ID store, opened once, and its live pick list
+
+		key: 	string of the store's key in stores.STORES (e.g. "amazon")
+	"""
+
+	def __init__(self, key):
+		self.key = key
+		self.store = STORES[key]
+		self.state = order_state.OrderState(self.store['ids'])
+		# read only: the store script marks orders as processed, so its next pick list leaves them off the live one too
+		self.order_id_store = order_ids.OrderIdStore(self.store['ids'])
+		self.statuses = {order_status for _store_id, order_status in self.store['queries']}
+		# SKU quantities the live pick list was generated from
+		self._new_orders_dict = None
+		self.pick_list = None
+
+	def update(self, order_streams, full, normalization_cache, location_index, pushed=False):
+		"""
+		Applies one poll's order streams to the store's state; returns True if the live pick list was regenerated
+
+			order_streams: 			iterables of JSON order dictionaries, one per query from pipeline.order_queries
+			full: 					boolean, True if the streams hold every outstanding order
+			normalization_cache: 	SkuCache memoizing SKU cleaning and normalization
+			location_index: 		optional locations.LocationIndex (see logic.create_pick_list)
+			pushed: 				boolean, True for orders referenced by a webhook rather than polled
+		"""
+		watermarks = dict(self.state.watermarks)
+		orders = dict(self.state.orders)
+		try:
+			self.state.update(
+				itertools.chain.from_iterable(order_streams), self.statuses, self.store['is_ebay'], normalization_cache,
+				full=full
+			)
+		except:
+			# a poll that fails part way leaves the state as it was, so the next poll requests the same orders again
+			self.state.watermarks = watermarks
+			self.state.orders = orders
+			raise
+
+		# pushed orders are only some of the modified orders, so the next poll still starts from the last polled one
+		if pushed:
+			self.state.watermarks = watermarks
+		# modified orders move the watermark forward (the latest order is returned by every poll, so this is not a count)
+		if full or pushed or self.state.watermarks != watermarks:
+			self.state.save()
+
+		new_orders_dict, number_of_new = logic.new_orders_of(self.state.orders.values(), self.order_id_store)
+		if new_orders_dict == self._new_orders_dict:
+			return False
+
+		cleaned_orders_dict = {}
+		logic.clean_and_normalize_order_data(new_orders_dict, cleaned_orders_dict, sku_cache=normalization_cache)
+		rows = logic.pick_list_rows(cleaned_orders_dict, location_index)
+
+		ORDERS_FILE = live_file(self.store['orders'])
+		title = self.store['name'] + ' LIVE'
+		generated = datetime.datetime.now()
+		rendered = {fmt: render.render_pick_list(rows, fmt, title, generated) for fmt in render.FORMATS}
+		render.write_rendered(ORDERS_FILE, rendered)
+
+		self._new_orders_dict = new_orders_dict
+		self.pick_list = LivePickList(
+			generated, len(self.state.orders), number_of_new, sum(row.quantity for row in rows), rendered
+		)
+		return True
+
+	def close(self):
+		self.order_id_store.close()
+
+
+class Watcher:
+	"""
+	Polls ShipStation for every watched store and keeps their live pick lists current
+
+		store_keys: 	list of keys of stores.STORES to watch
+	"""
+
+	def __init__(self, store_keys):
+		self.watches = {key: StoreWatch(key) for key in store_keys}
+		# key : str (ShipStation store ID)
+		# val : StoreWatch of the store the ID belongs to
+		self._by_store_id = {str(store_id): watch for watch in self.watches.values() for store_id in watch.store['store_ids']}
+		# memoized SKU cleaning and normalization, saved whenever a pick list changes
+		self.normalization_cache = sku_cache.SkuCache()
+		# webhook resource URLs received by the HTTP thread, applied by the polling thread (see ingest)
+		self.pushed = queue.Queue()
+		self.polls = 0
+		self.webhooks = 0
+		self.last_poll = None
+		self.last_error = None
+		# error of the latest poll's store refresh, None if it succeeded (see _refresh)
+		self.refresh_error = None
+
+	def poll(self):
+		"""
+		Polls every watched store once; returns the list of StoreWatches whose live pick list was regenerated
+		"""
+		instrument.reset()
+		shipstation.reset_latencies()
+		watches = list(self.watches.values())
+
+		# new marketplace orders are imported while the changed orders are requested; the next poll picks them up
+		self.refresh_error = self._refresh(watches)
+		if self.refresh_error is not None:
+			print('Refresh failed: ' + self.refresh_error)
+
+		# every store's queries: first pages are requested concurrently, later pages are prefetched while parsing
+		queries_by_store = [pipeline.order_queries(watch.store, watch.state) for watch in watches]
+		order_streams = iter(shipstation.stream_orders_concurrently(
+			[query for queries, _full in queries_by_store for query in queries]
+		))
+
+		location_index = locations.load()
+		changed = []
+		for watch, (queries, full) in zip(watches, queries_by_store):
+			streams = [next(order_streams) for _query in queries]
+			if watch.update(streams, full, self.normalization_cache, location_index):
+				changed.append(watch)
+
+		if changed:
+			self.normalization_cache.save()
+		self.polls += 1
+		self.last_poll = datetime.datetime.now()
+		return changed
+
+	# helper: asks ShipStation to import new orders of every store, best effort: returns the error (None if every store
+	# refresh succeeded) rather than raising, so a failing refresh never keeps the polls from requesting the orders that
+	# have been imported already
+	def _refresh(self, watches):
+		store_ids = [(watch, store_id) for watch in watches for store_id in watch.store['store_ids']]
+		try:
+			refreshed = shipstation.refresh_stores([store_id for _watch, store_id in store_ids])
+		except Exception as e:
+			return f'{datetime.datetime.now():%I:%M %p} {e}'
+		failed = sorted({watch.store['name'] for (watch, _store_id), success in zip(store_ids, refreshed) if not success})
+		if failed:
+			return f'{datetime.datetime.now():%I:%M %p} store refresh unsuccessful: {", ".join(failed)}'
+		return None
+
+	def ingest(self, resource_url):
+		"""
+		Requests the orders referenced by a webhook's resource URL and applies them to their stores; returns the list of
+		StoreWatches whose live pick list was regenerated (orders of stores that are not watched are ignored)
+		"""
+		instrument.reset()
+		shipstation.reset_latencies()
+		# key : StoreWatch
+		# val : list of the webhook's JSON order dictionaries of the store
+		orders_by_watch = {}
+		for order in shipstation.iter_resource_orders(resource_url):
+			watch = self._by_store_id.get(logic.store_id_of(order))
+			if watch is not None:
+				orders_by_watch.setdefault(watch, []).append(order)
+
+		location_index = locations.load()
+		changed = []
+		for watch, orders in orders_by_watch.items():
+			if watch.update([orders], False, self.normalization_cache, location_index, pushed=True):
+				changed.append(watch)
+
+		if changed:
+			self.normalization_cache.save()
+		self.webhooks += 1
+		return changed
+
+	def summary(self):
+		"""
+		Returns the JSON summary dictionary of every watched store
+		"""
+		stores = {}
+		for key, watch in self.watches.items():
+			pick_list = watch.pick_list
+			stores[key] = None if pick_list is None else {
+				'name': watch.store['name'],
+				'generated': pick_list.generated.isoformat(timespec='seconds'),
+				'orders': pick_list.number_of_orders,
+				'new_orders': pick_list.number_of_new,
+				'items': pick_list.quantity,
+				'pick_list': '/' + key,
+			}
+		return {
+			'polls': self.polls,
+			'webhooks': self.webhooks,
+			'last_poll': None if self.last_poll is None else self.last_poll.isoformat(timespec='seconds'),
+			'last_error': self.last_error,
+			'refresh_error': self.refresh_error,
+			'stores': stores,
+		}
+
+	def close(self):
+		for watch in self.watches.values():
+			watch.close()
+
+
+def make_handler(watcher, token=WEBHOOK_TOKEN):
+	"""
+	Returns the request handler class serving a Watcher's live pick lists and receiving its webhooks
+
+		watcher: 	Watcher
+		token: 		optional string a webhook URL must carry as its "token" query parameter
+	"""
+
+	class WatchHandler(BaseHTTPRequestHandler):
+		protocol_version = 'HTTP/1.1'
+
+		def _send(self, status, content_type, body):
+			data = body.encode('utf-8')
+			self.send_response(status)
+			self.send_header('Content-Type', content_type)
+			self.send_header('Content-Length', str(len(data)))
+			self.send_header('Cache-Control', 'no-store')
+			self.end_headers()
+			self.wfile.write(data)
+
+		def _error(self, status, message):
+			self._send(status, CONTENT_TYPES['json'], json.dumps({'Message': message}))
+
+		def do_GET(self):
+			path = urlsplit(self.path).path.strip('/')
+			if not path:
+				self._send(200, CONTENT_TYPES['json'], json.dumps(watcher.summary(), indent=2))
+				return
+
+			# /amazon -> ("amazon", "txt"), /amazon.html -> ("amazon", "html")
+			key, _dot, fmt = path.partition('.')
+			fmt = fmt or 'txt'
+			watch = watcher.watches.get(key)
+			if watch is None or fmt not in CONTENT_TYPES:
+				self._error(404, f'no pick list at /{path}')
+				return
+			pick_list = watch.pick_list
+			if pick_list is None:
+				self._error(503, f'{watch.store["name"]} has not been polled yet')
+				return
+			self._send(200, CONTENT_TYPES[fmt], pick_list.rendered[fmt])
+
+		def do_POST(self):
+			url = urlsplit(self.path)
+			length = int(self.headers.get('Content-Length') or 0)
+			if url.path.rstrip('/') != '/webhook':
+				self.rfile.read(length)
+				self._error(404, f'nothing to post at {url.path}')
+				return
+			if length > MAX_WEBHOOK_BYTES:
+				self.close_connection = True
+				self._error(413, 'webhook payload too large')
+				return
+			body = self.rfile.read(length)
+
+			if token is not None:
+				given = parse_qs(url.query).get('token', [''])[0]
+				if not hmac.compare_digest(given.encode('utf-8'), token.encode('utf-8')):
+					self._error(403, 'invalid webhook token')
+					return
+
+			try:
+				payload = json.loads(body)
+				resource_url = payload['resource_url']
+				resource_type = payload.get('resource_type')
+			except (ValueError, TypeError, KeyError):
+				self._error(400, 'expected a JSON webhook payload with a "resource_url"')
+				return
+			if resource_type not in WEBHOOK_RESOURCE_TYPES:
+				# acknowledged, so ShipStation does not retry a webhook this receiver has no use for
+				self._send(200, CONTENT_TYPES['json'], json.dumps({'Message': f'ignored {resource_type} webhook'}))
+				return
+			if not isinstance(resource_url, str) or not shipstation.resource_path(resource_url).startswith('/orders'):
+				self._error(400, 'the webhook resource is not an order list')
+				return
+
+			# applied by the polling thread, which owns the order state (see run)
+			watcher.pushed.put(resource_url)
+			self._send(202, CONTENT_TYPES['json'], json.dumps({'Message': 'queued'}))
+
+		def log_message(self, format, *args):
+			pass
+
+	return WatchHandler
+
+
+def serve(watcher, host=HOST, port=PORT, token=WEBHOOK_TOKEN):
+	"""
+	Returns a started HTTP server for a Watcher (serving on a background thread); call shutdown() to stop it
+
+	A port of 0 picks a free port; the chosen one is server.server_address[1].
+	"""
+	server = ThreadingHTTPServer((host, port), make_handler(watcher, token))
+	server.daemon_threads = True
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	return server
+
+
+# helper: runs a poll or webhook step, printing every regenerated pick list, or the error of a failed step (its orders are
+# requested again by the next poll)
+def _attempt(watcher, step, name):
+	try:
+		changed = step()
+	except Exception as e:
+		watcher.last_error = f'{datetime.datetime.now():%I:%M %p} {name}: {e}'
+		print(name + ' failed: ' + str(e))
+		return
+	watcher.last_error = None
+	for watch in changed:
+		pick_list = watch.pick_list
+		print(
+			f'{pick_list.generated:%I:%M %p} {watch.store["name"]}: {pick_list.number_of_new} new of '
+			f'{pick_list.number_of_orders} orders, {pick_list.quantity} items - {live_file(watch.store["orders"])}'
+		)
+
+
+def run(watcher, interval=POLL_SECONDS, polls=None):
+	"""
+	Polls every interval seconds (polls times, or until interrupted), applying webhook resources as they arrive between
+	polls; a failed poll or webhook is reported and its orders are requested again by the next poll
+	"""
+	attempts = 0
+	while polls is None or attempts < polls:
+		attempts += 1
+		deadline = time.monotonic() + interval
+		_attempt(watcher, watcher.poll, 'Poll')
+
+		# queued webhooks, then each one as it arrives until the next poll
+		while True:
+			try:
+				resource_url = watcher.pushed.get(timeout=max(0, deadline - time.monotonic()))
+			except queue.Empty:
+				break
+			_attempt(watcher, lambda: watcher.ingest(resource_url), 'Webhook')
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='Keep live pick lists current and serve them over HTTP.')
+	parser.add_argument('--stores', nargs='+', choices=list(STORES), default=list(STORES), help='stores to watch')
+	parser.add_argument('--interval', type=float, default=POLL_SECONDS, help='seconds between polls')
+	parser.add_argument('--host', default=HOST)
+	parser.add_argument('--port', type=int, default=PORT)
+	args = parser.parse_args(argv)
+
+	watcher = Watcher(args.stores)
+	server = serve(watcher, args.host, args.port)
+	print(f'Watching {", ".join(args.stores)} every {args.interval:g}s - http://{args.host}:{server.server_address[1]}/')
+	try:
+		run(watcher, args.interval)
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.shutdown()
+		watcher.close()
+
+
+if __name__ == '__main__':
+	sys.exit(main())